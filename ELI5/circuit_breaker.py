@@ -0,0 +1,192 @@
+"""
+Circuit breaker for calls to the Gemini API.
+"""
+
+import asyncio
+import os
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its breaker is open."""
+
+
+class CircuitBreakerConfig:
+    """Configuration for the Gemini circuit breaker."""
+
+    def __init__(self):
+        # Number of recent calls the error and slow-call rates are computed over
+        self.window = int(os.getenv("BREAKER_WINDOW", "20"))
+        # Minimum calls in the window before the breaker may trip
+        self.min_calls = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+        # Trip when this share of recent calls failed
+        self.error_rate = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+        # Calls slower than this count as slow (seconds)
+        self.slow_call_seconds = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "20.0"))
+        # Trip when this share of recent calls were slow
+        self.slow_call_rate = float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.5"))
+        # How long the breaker stays open before letting a probe through (seconds)
+        self.open_seconds = float(os.getenv("BREAKER_OPEN_SECONDS", "30.0"))
+        # Calls taking longer than this are abandoned and counted as failures
+        self.call_timeout = float(os.getenv("GEMINI_CALL_TIMEOUT", "60.0"))
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker that trips on the error rate or slow-call
+    rate over a sliding window of recent calls. While open, calls fail fast
+    with CircuitOpenError; after `open_seconds` a single probe is let through
+    and its outcome decides whether the breaker closes again. Errors for
+    which `ignore` returns True (e.g. rate limiting) say nothing about the
+    dependency's health and are not counted.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        config: CircuitBreakerConfig,
+        ignore: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.name = name
+        self.config = config
+        self.ignore = ignore
+        self.state = self.CLOSED
+        # (failed, slow) for each recent call
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=config.window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._transitions: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self._rejected = 0
+        self._ignored = 0
+
+    def _transition(self, state: str, reason: str):
+        if state == self.state:
+            return
+        logger.warning(
+            f"Circuit breaker '{self.name}' {self.state} -> {state}: {reason}"
+        )
+        self._transitions.append(
+            {
+                "from": self.state,
+                "to": state,
+                "reason": reason,
+                "at": datetime.now(timezone.utc).isoformat(),
+            }
+        )
+        self.state = state
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+        if state != self.HALF_OPEN:
+            self._outcomes.clear()
+
+    def before_call(self):
+        """Raise CircuitOpenError if a call may not go through right now."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.config.open_seconds:
+                self._rejected += 1
+                raise CircuitOpenError(f"Circuit '{self.name}' is open")
+            self._transition(self.HALF_OPEN, "open period elapsed")
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                self._rejected += 1
+                raise CircuitOpenError(f"Circuit '{self.name}' is half-open")
+            self._probe_in_flight = True
+
+    def record_success(self, latency: float):
+        slow = latency >= self.config.slow_call_seconds
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+            if slow:
+                self._transition(self.OPEN, f"probe took {latency:.1f}s")
+            else:
+                self._transition(self.CLOSED, "probe succeeded")
+            return
+        self._outcomes.append((False, slow))
+        self._evaluate()
+
+    def record_failure(self, reason: str = "call failed"):
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+            self._transition(self.OPEN, f"probe failed: {reason}")
+            return
+        self._outcomes.append((True, False))
+        self._evaluate()
+
+    def record_error(self, error: BaseException):
+        """Record a call that raised `error`, unless the breaker ignores it."""
+        if self.ignore is not None and self.ignore(error):
+            # Neither a failure nor a success; a probe may be sent again
+            self._ignored += 1
+            self.release_probe()
+            return
+        self.record_failure(type(error).__name__)
+
+    def release_probe(self):
+        """Forget an in-flight probe whose caller went away before it finished."""
+        self._probe_in_flight = False
+
+    def _evaluate(self):
+        if self.state != self.CLOSED or len(self._outcomes) < self.config.min_calls:
+            return
+        calls = len(self._outcomes)
+        error_rate = sum(1 for failed, _ in self._outcomes if failed) / calls
+        slow_rate = sum(1 for _, slow in self._outcomes if slow) / calls
+        if error_rate >= self.config.error_rate:
+            self._transition(self.OPEN, f"error rate {error_rate:.0%}")
+        elif slow_rate >= self.config.slow_call_rate:
+            self._transition(self.OPEN, f"slow call rate {slow_rate:.0%}")
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` through the breaker with the configured call timeout."""
+        self.before_call()
+        return await self.run(fn)
+
+    async def run(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `fn` with the call timeout and record its outcome. The caller must
+        already have been admitted with `before_call`.
+        """
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(fn(), timeout=self.config.call_timeout)
+        except asyncio.CancelledError:
+            self.release_probe()
+            raise
+        except asyncio.TimeoutError:
+            self.record_failure("timed out")
+            raise
+        except Exception as e:
+            self.record_error(e)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Current state and recent transitions."""
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "error_rate": (
+                sum(1 for failed, _ in self._outcomes if failed) / calls
+                if calls
+                else 0.0
+            ),
+            "slow_call_rate": (
+                sum(1 for _, slow in self._outcomes if slow) / calls if calls else 0.0
+            ),
+            "rejected": self._rejected,
+            "ignored": self._ignored,
+            "transitions": list(self._transitions),
+        }
@@ -0,0 +1,229 @@
+"""
+Persistent on-disk cache of generated explanations.
+"""
+
+import asyncio
+import hashlib
+import os
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ExplanationCacheConfig:
+    """Configuration for the explanation cache."""
+
+    def __init__(self):
+        # SQLite file holding cached explanations (empty disables the cache)
+        self.path = os.getenv("EXPLANATION_CACHE_PATH", "./explanation_cache.db")
+        # How long a cached explanation stays valid (seconds)
+        self.ttl = float(os.getenv("EXPLANATION_CACHE_TTL", "86400"))
+        # Maximum number of cached explanations before LRU eviction
+        self.max_entries = int(os.getenv("EXPLANATION_CACHE_MAX_ENTRIES", "500"))
+        # How often buffered last-access times are written back (seconds)
+        self.access_flush_interval = float(
+            os.getenv("EXPLANATION_CACHE_ACCESS_FLUSH_INTERVAL", "30")
+        )
+
+
+def hash_prompt(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """
+    SQLite-backed cache keyed by (concept, model, prompt hash) with TTL
+    expiry and size-bounded LRU eviction. Survives restarts and redeploys
+    as long as the cache file lives on a persistent volume. Hits only note
+    their access time in memory; those times are written back with the next
+    store or every `access_flush_interval` seconds, so reads stay read-only.
+    """
+
+    def __init__(self, config: ExplanationCacheConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # Last-access times not yet written back, by cache key
+        self._accessed: Dict[Tuple[str, str, str], float] = {}
+        self._flushed_at = time.monotonic()
+
+        if not config.path:
+            return
+        try:
+            self._conn = sqlite3.connect(config.path, check_same_thread=False)
+            # Let readers proceed while a write is in progress
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS explanations (
+                    concept TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    explanation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (concept, model, prompt_hash)
+                )
+                """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_explanations_last_access "
+                "ON explanations (last_access)"
+            )
+            self._conn.commit()
+            logger.info(f"Explanation cache opened at {config.path}")
+        except sqlite3.Error as e:
+            self._conn = None
+            logger.error(f"Failed to open explanation cache: {str(e)}")
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def _get(self, concept: str, model: str, prompt_hash: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT explanation, created_at FROM explanations "
+                "WHERE concept = ? AND model = ? AND prompt_hash = ?",
+                (concept, model, prompt_hash),
+            ).fetchone()
+            if row is None:
+                return None
+
+            explanation, created_at = row
+            if now - created_at > self.config.ttl:
+                # Kept as the last good explanation until it is replaced or
+                # evicted
+                return None
+
+            self._accessed[(concept, model, prompt_hash)] = now
+            if time.monotonic() - self._flushed_at >= self.config.access_flush_interval:
+                self._flush_accessed()
+                self._conn.commit()
+            return explanation
+
+    def _flush_accessed(self):
+        """Write buffered last-access times back. Call with the lock held."""
+        self._flushed_at = time.monotonic()
+        if not self._accessed:
+            return
+        self._conn.executemany(
+            "UPDATE explanations SET last_access = ? "
+            "WHERE concept = ? AND model = ? AND prompt_hash = ?",
+            [(at, *key) for key, at in self._accessed.items()],
+        )
+        self._accessed.clear()
+
+    def _set(self, concept: str, model: str, prompt_hash: str, explanation: str):
+        now = time.time()
+        with self._lock:
+            # Eviction below must see recent hits
+            self._flush_accessed()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO explanations "
+                "(concept, model, prompt_hash, explanation, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (concept, model, prompt_hash, explanation, now, now),
+            )
+            # Evict least recently used entries beyond the size bound
+            cursor = self._conn.execute(
+                "DELETE FROM explanations WHERE rowid IN ("
+                "SELECT rowid FROM explanations ORDER BY last_access DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.config.max_entries,),
+            )
+            self._evictions += max(cursor.rowcount, 0)
+            self._conn.commit()
+
+    def _get_latest(self, concept: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT explanation FROM explanations WHERE concept = ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (concept,),
+            ).fetchone()
+        return row[0] if row else None
+
+    async def get_latest(self, concept: str) -> Optional[str]:
+        """
+        Last good explanation for a concept regardless of model, prompt or
+        TTL. Used to degrade gracefully while Gemini is unavailable.
+        """
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._get_latest, concept)
+        except sqlite3.Error as e:
+            logger.error(f"Explanation cache read failed: {str(e)}")
+            return None
+
+    async def get(self, concept: str, model: str, prompt: str) -> Optional[str]:
+        """Look up a cached explanation, or None on a miss or expiry."""
+        if not self.enabled:
+            return None
+        try:
+            explanation = await asyncio.to_thread(
+                self._get, concept, model, hash_prompt(prompt)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Explanation cache read failed: {str(e)}")
+            explanation = None
+
+        if explanation is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return explanation
+
+    async def set(self, concept: str, model: str, prompt: str, explanation: str):
+        """Store an explanation, evicting old entries if the cache is full."""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(
+                self._set, concept, model, hash_prompt(prompt), explanation
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Explanation cache write failed: {str(e)}")
+
+    def close(self):
+        """Close the cache file."""
+        if self._conn is not None:
+            with self._lock:
+                try:
+                    self._flush_accessed()
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Explanation cache write failed: {str(e)}")
+                self._conn.close()
+            self._conn = None
+
+    def _count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+
+    async def stats(self) -> Dict[str, Any]:
+        """Cache size and hit rate."""
+        entries = 0
+        if self.enabled:
+            try:
+                entries = await asyncio.to_thread(self._count)
+            except sqlite3.Error as e:
+                logger.error(f"Explanation cache read failed: {str(e)}")
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.config.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+        }
@@ -0,0 +1,166 @@
+"""
+Warm pool of pre-generated explanations for each concept.
+"""
+
+import asyncio
+import os
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExplanationPoolConfig:
+    """Configuration for the pre-generated explanation pool."""
+
+    def __init__(self):
+        # Number of ready explanations kept per concept (0 disables the pool)
+        self.size = int(os.getenv("EXPLANATION_POOL_SIZE", "2"))
+        # Refill budget: background generations allowed per minute
+        self.refill_per_minute = float(
+            os.getenv("EXPLANATION_POOL_REFILL_PER_MINUTE", "10")
+        )
+        # Pause after a failed refill before trying again (seconds)
+        self.error_backoff = float(os.getenv("EXPLANATION_POOL_ERROR_BACKOFF", "30.0"))
+
+
+class ExplanationPool:
+    """
+    Keeps up to `size` ready explanations per concept. Requests pop from the
+    pool instantly while a background task refills it within the budget.
+    """
+
+    def __init__(
+        self,
+        concepts: List[str],
+        generate: Callable[[str], Awaitable[str]],
+        config: ExplanationPoolConfig,
+    ):
+        self.concepts = list(concepts)
+        self.generate = generate
+        self.config = config
+        self._pools: Dict[str, Deque[str]] = {c: deque() for c in self.concepts}
+        # When each concept's pool last dropped below its target depth
+        self._below_since: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self._hits = 0
+        self._misses = 0
+        self._refills = 0
+        self._refill_errors = 0
+        self._last_refill_lag = 0.0
+        self._total_refill_lag = 0.0
+        self._refilled_concepts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.size > 0 and self.config.refill_per_minute > 0
+
+    def pop(self, concept: str) -> Optional[str]:
+        """Take a ready explanation for a concept, or None if the pool is dry."""
+        pool = self._pools.get(concept)
+        if not self.enabled or pool is None:
+            return None
+
+        if pool:
+            explanation = pool.popleft()
+            self._hits += 1
+        else:
+            explanation = None
+            self._misses += 1
+
+        self._below_since.setdefault(concept, time.monotonic())
+        self._wakeup.set()
+        return explanation
+
+    def _next_concept(self) -> Optional[str]:
+        """Pick the concept whose pool is furthest below its target depth."""
+        candidates = [
+            c for c in self.concepts if len(self._pools[c]) < self.config.size
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: len(self._pools[c]))
+
+    async def _refill_loop(self):
+        interval = 60.0 / self.config.refill_per_minute
+        while True:
+            concept = self._next_concept()
+            if concept is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            self._below_since.setdefault(concept, time.monotonic())
+            try:
+                explanation = await self.generate(concept)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._refill_errors += 1
+                logger.warning(
+                    f"Failed to refill explanation pool for {concept}: {str(e)}"
+                )
+                await asyncio.sleep(self.config.error_backoff)
+                continue
+
+            pool = self._pools[concept]
+            pool.append(explanation)
+            self._refills += 1
+
+            if len(pool) >= self.config.size:
+                lag = time.monotonic() - self._below_since.pop(concept)
+                self._last_refill_lag = lag
+                self._total_refill_lag += lag
+                self._refilled_concepts += 1
+
+            await asyncio.sleep(interval)
+
+    def start(self):
+        """Start the background refill task."""
+        if not self.enabled or self._task is not None:
+            return
+        logger.info(
+            f"Starting explanation pool: {self.config.size} per concept, "
+            f"{self.config.refill_per_minute} refills/minute"
+        )
+        self._task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self):
+        """Stop the background refill task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool depth, hit rate and refill lag."""
+        lookups = self._hits + self._misses
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "target_depth": self.config.size,
+            "depth": {c: len(p) for c, p in self._pools.items()},
+            "ready": sum(len(p) for p in self._pools.values()),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "refills": self._refills,
+            "refill_errors": self._refill_errors,
+            "last_refill_lag_seconds": self._last_refill_lag,
+            "avg_refill_lag_seconds": (
+                self._total_refill_lag / self._refilled_concepts
+                if self._refilled_concepts
+                else 0.0
+            ),
+            "oldest_pending_refill_seconds": (
+                now - min(self._below_since.values()) if self._below_since else 0.0
+            ),
+        }
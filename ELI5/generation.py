@@ -0,0 +1,414 @@
+"""
+Gemini generation helpers for the ELI5 service.
+"""
+
+import asyncio
+import os
+import logging
+import time
+from collections import deque
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+)
+from fastapi import HTTPException
+from google.genai import errors, types
+from rate_limiter import Priority, RateLimiter
+from circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationConfig:
+    """Configuration for calls to the Gemini API."""
+
+    def __init__(self):
+        self.model = os.getenv("GEMINI_MODEL", "gemini-pro")
+
+        # Number of Gemini calls allowed in flight at the same time
+        self.max_concurrency = int(os.getenv("GENERATION_MAX_CONCURRENCY", "8"))
+        # Number of requests allowed to wait for a free generation slot
+        self.max_waiting = int(os.getenv("GENERATION_MAX_WAITING", "100"))
+        # How long a request may wait for a slot before giving up (seconds)
+        self.queue_timeout = float(os.getenv("GENERATION_QUEUE_TIMEOUT", "30.0"))
+
+        # Opt-in hedging: fire a second call when the first is slower than
+        # the given percentile of recent latency
+        self.hedge_enabled = os.getenv("GEMINI_HEDGE_ENABLED", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        self.hedge_percentile = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "95"))
+        # Hedges allowed per primary call, e.g. 0.1 spends at most ~10% extra quota
+        self.hedge_budget = float(os.getenv("GEMINI_HEDGE_BUDGET", "0.1"))
+        # Latency samples needed before hedging starts
+        self.hedge_min_samples = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", "20"))
+
+
+def build_contents(prompt: str) -> List[types.Content]:
+    """Wrap a prompt in the content format expected by the Gemini API."""
+    return [
+        types.Content(
+            role="user",
+            parts=[types.Part.from_text(text=prompt)],
+        ),
+    ]
+
+
+def build_generate_config() -> types.GenerateContentConfig:
+    """Configure the generation parameters."""
+    return types.GenerateContentConfig(
+        response_mime_type="text/plain",
+    )
+
+
+class HedgePolicy:
+    """
+    Decides when to hedge a Gemini call. The hedge delay is a percentile of
+    recent call latency, and hedges draw from a budget that earns
+    `hedge_budget` tokens per primary call, capping the extra quota spent.
+    """
+
+    def __init__(self, config: GenerationConfig):
+        self.config = config
+        self._latencies: Deque[float] = deque(maxlen=200)
+        self._budget = 0.0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._skipped = 0
+
+    def record_latency(self, latency: float):
+        self._latencies.append(latency)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None if hedging is off."""
+        if not self.config.hedge_enabled:
+            return None
+        if len(self._latencies) < self.config.hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = int(len(ordered) * self.config.hedge_percentile / 100)
+        return ordered[min(index, len(ordered) - 1)]
+
+    def earn(self):
+        """Credit the budget for one primary call."""
+        self._budget = min(self._budget + self.config.hedge_budget, 10.0)
+
+    def try_spend(self) -> bool:
+        """Take one hedge from the budget if there is enough left."""
+        if self._budget < 1.0:
+            self._skipped += 1
+            return False
+        self._budget -= 1.0
+        self._hedged += 1
+        return True
+
+    def record_win(self):
+        self._hedge_wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hedge delay and counters."""
+        return {
+            "enabled": self.config.hedge_enabled,
+            "delay_seconds": self.delay(),
+            "samples": len(self._latencies),
+            "hedged": self._hedged,
+            "hedge_wins": self._hedge_wins,
+            "skipped_over_budget": self._skipped,
+            "budget": self._budget,
+        }
+
+
+class GenerationPool:
+    """
+    Runs Gemini generations on the SDK's async client with a bounded number
+    of calls in flight. Requests beyond the limit wait in a bounded queue.
+    When a rate limiter is given, every call first waits for budget in its
+    priority lane and 429 responses are retried after the server's delay.
+    When a circuit breaker is given, calls fail fast with CircuitOpenError
+    while it is open. With hedging enabled, a slow call is raced against a
+    second one and the loser is cancelled.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        config: GenerationConfig,
+        limiter: Optional[RateLimiter] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.client = client
+        self.config = config
+        self.limiter = limiter
+        self.breaker = breaker
+        self.hedging = HedgePolicy(config)
+        self._semaphore = asyncio.Semaphore(config.max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def _acquire_slot(self):
+        """Wait for a free generation slot, rejecting when the queue is full."""
+        if not self._semaphore.locked():
+            # A slot is free, so this request never waits in the queue
+            await self._semaphore.acquire()
+            return
+
+        if self._waiting >= self.config.max_waiting:
+            self._rejected += 1
+            logger.warning("Generation queue is full, rejecting request")
+            raise HTTPException(
+                status_code=503, detail="Too many explanations in progress"
+            )
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(
+                self._semaphore.acquire(), timeout=self.config.queue_timeout
+            )
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            logger.warning("Timed out waiting for a generation slot")
+            raise HTTPException(
+                status_code=503, detail="Too many explanations in progress"
+            )
+        finally:
+            self._waiting -= 1
+
+    async def _admit(self, priority: Priority):
+        """Pass the breaker, then wait for rate-limit budget and a free slot."""
+        if self.breaker is not None:
+            self.breaker.before_call()
+        try:
+            if self.limiter is not None:
+                await self.limiter.acquire(priority)
+            await self._acquire_slot()
+        except BaseException:
+            if self.breaker is not None:
+                self.breaker.release_probe()
+            raise
+        self._in_flight += 1
+
+    async def _generate_once(
+        self,
+        prompt: str,
+        model: str,
+        priority: Priority,
+        admitted: Optional[asyncio.Event] = None,
+    ):
+        """
+        Make one call. Its latency sample starts once it is admitted, so time
+        spent waiting for rate-limit budget or a slot is not counted; when
+        given, `admitted` is set at that point.
+        """
+        await self._admit(priority)
+        if admitted is not None:
+            admitted.set()
+        start = time.monotonic()
+
+        def call():
+            return self.client.aio.models.generate_content(
+                model=model,
+                contents=build_contents(prompt),
+                config=build_generate_config(),
+            )
+
+        try:
+            if self.breaker is not None:
+                response = await self.breaker.run(call)
+            else:
+                response = await call()
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+        if self.limiter is not None and response.usage_metadata is not None:
+            self.limiter.record_usage(response.usage_metadata.total_token_count)
+        self._completed += 1
+        self.hedging.record_latency(time.monotonic() - start)
+        return response
+
+    async def _generate_hedged(self, prompt: str, model: str, priority: Priority):
+        """
+        Run one call and, if it outlives the hedge delay after being admitted,
+        race it against a second call. The first successful response wins;
+        the other is cancelled.
+        """
+        delay = self.hedging.delay()
+        if delay is None:
+            return await self._generate_once(prompt, model, priority)
+
+        self.hedging.earn()
+        admitted = asyncio.Event()
+        primary = asyncio.ensure_future(
+            self._generate_once(prompt, model, priority, admitted)
+        )
+        hedge = None
+        try:
+            # Queueing for budget or a slot does not count toward the delay
+            admission = asyncio.ensure_future(admitted.wait())
+            try:
+                await asyncio.wait(
+                    {primary, admission}, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                admission.cancel()
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self.hedging.try_spend():
+                return await primary
+
+            logger.info(f"Hedging Gemini call after {delay:.1f}s")
+            hedge = asyncio.ensure_future(self._generate_once(prompt, model, priority))
+            pending = {primary, hedge}
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedging.record_win()
+                        return task.result()
+                if not pending:
+                    # Both calls failed; report the primary's error
+                    raise primary.exception()
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def generate(
+        self, prompt: str, model: str, priority: Priority = Priority.ANONYMOUS
+    ) -> str:
+        """Generate text for a prompt and return the response text."""
+        attempt = 0
+        while True:
+            try:
+                response = await self._generate_hedged(prompt, model, priority)
+                return response.text
+            except errors.APIError as e:
+                if e.code != 429 or self.limiter is None:
+                    raise
+                delay = self.limiter.throttle(e, attempt)
+                if attempt >= self.limiter.config.max_retries:
+                    raise HTTPException(
+                        status_code=429,
+                        detail="Explanation service is busy, please try again shortly",
+                        headers={"Retry-After": str(int(delay) + 1)},
+                    )
+                attempt += 1
+
+    async def stream(
+        self, prompt: str, model: str, priority: Priority = Priority.ANONYMOUS
+    ) -> AsyncIterator[str]:
+        """
+        Generate text for a prompt, yielding chunks as Gemini produces them.
+        The breaker judges streamed calls by their time to first chunk, and
+        opening the stream or waiting for any chunk longer than its call
+        timeout fails the call.
+        """
+        await self._admit(priority)
+        timeout = self.breaker.config.call_timeout if self.breaker else None
+        start = time.monotonic()
+        first_chunk_latency = None
+        try:
+            chunks = await asyncio.wait_for(
+                self.client.aio.models.generate_content_stream(
+                    model=model,
+                    contents=build_contents(prompt),
+                    config=build_generate_config(),
+                ),
+                timeout=timeout,
+            )
+            iterator = chunks.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(
+                        iterator.__anext__(), timeout=timeout
+                    )
+                except StopAsyncIteration:
+                    break
+                if first_chunk_latency is None:
+                    first_chunk_latency = time.monotonic() - start
+                if chunk.text:
+                    yield chunk.text
+            self._completed += 1
+            if self.breaker is not None:
+                self.breaker.record_success(
+                    first_chunk_latency or time.monotonic() - start
+                )
+        except (asyncio.CancelledError, GeneratorExit):
+            if self.breaker is not None:
+                self.breaker.release_probe()
+            raise
+        except Exception as e:
+            if self.breaker is not None:
+                self.breaker.record_error(e)
+            if isinstance(e, errors.APIError) and e.code == 429:
+                if self.limiter is not None:
+                    self.limiter.throttle(e, 0)
+            raise
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current pool usage."""
+        return {
+            "max_concurrency": self.config.max_concurrency,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller starts the
+    work and every caller that arrives while it is in flight awaits the same
+    result instead of starting its own.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._started = 0
+        self._coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            self._started += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self._coalesced += 1
+            logger.info(f"Joining in-flight generation for {key}")
+
+        # Shield so one caller going away does not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Started and coalesced call counts."""
+        return {
+            "in_flight": len(self._in_flight),
+            "started": self._started,
+            "coalesced": self._coalesced,
+        }
@@ -0,0 +1,301 @@
+"""
+Write-behind delivery of history records to the history service.
+"""
+
+import asyncio
+import json
+import os
+import logging
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from jose import JWTError, jwt
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryQueueConfig:
+    """Configuration for the history write-behind queue."""
+
+    def __init__(self):
+        # Records held in memory before new ones are spilled straight to disk
+        self.max_size = int(os.getenv("HISTORY_QUEUE_SIZE", "1000"))
+        # Records sent per batch, and how long to wait to fill one (seconds)
+        self.batch_size = int(os.getenv("HISTORY_BATCH_SIZE", "50"))
+        self.batch_wait = float(os.getenv("HISTORY_BATCH_WAIT", "0.05"))
+        # Delivery attempts per record before it is spilled to disk
+        self.max_attempts = int(os.getenv("HISTORY_MAX_ATTEMPTS", "3"))
+        self.retry_delay = float(os.getenv("HISTORY_RETRY_DELAY", "1.0"))
+        # Local file for records the history service could not take. Records
+        # carry the user's bearer token, so the file is created readable and
+        # writable by the owner only (0600)
+        self.spill_path = os.getenv("HISTORY_SPILL_PATH", "./history_spill.jsonl")
+        # How often spilled records are retried (seconds)
+        self.spill_retry_interval = float(
+            os.getenv("HISTORY_SPILL_RETRY_INTERVAL", "60.0")
+        )
+        # How long shutdown may spend flushing the queue (seconds)
+        self.flush_timeout = float(os.getenv("HISTORY_FLUSH_TIMEOUT", "5.0"))
+
+
+def token_expired(token: str) -> bool:
+    """Whether a token's `exp` has passed; its signature is not checked."""
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return True
+    return exp is not None and exp <= time.time()
+
+
+class HistoryWriteBehind:
+    """
+    Bounded in-process queue of history records drained by a background
+    worker. Records are grouped by token and sent in batches with retries;
+    whatever the history service cannot take is spilled to a local file and
+    replayed later. The queue is flushed on shutdown.
+    """
+
+    def __init__(self, history_client: Any, config: HistoryQueueConfig):
+        self.history_client = history_client
+        self.config = config
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=config.max_size)
+        self._worker: Optional[asyncio.Task] = None
+        self._replayer: Optional[asyncio.Task] = None
+        # Records taken off the queue by the worker but not yet settled
+        self._in_hand: List[Dict[str, Any]] = []
+
+        self._enqueued = 0
+        self._delivered = 0
+        self._retried = 0
+        self._spilled = 0
+        self._replayed = 0
+        self._dropped = 0
+        self._rejected = 0
+
+    def enqueue(self, token: str, concept_details: Dict[str, Any]) -> bool:
+        """
+        Queue a history record for delivery. Never blocks the caller. Returns
+        False if the queue was full and the record could not be spilled to
+        disk either, so it was dropped.
+        """
+        record = {
+            "token": token,
+            "concept_details": concept_details,
+            # Lets the history service recognise a record sent twice, e.g.
+            # when a batch timed out after it had been stored
+            "idempotency_key": uuid.uuid4().hex,
+            "attempts": 0,
+        }
+        self._enqueued += 1
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            logger.warning("History queue is full, spilling record to disk")
+            return self._spill([record])
+        return True
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        batch = self._in_hand
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.config.batch_wait
+        while len(batch) < self.config.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _send(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Send records grouped by token. Returns the records that failed and
+        may be retried; records the history service rejected are dropped.
+        """
+        by_token: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for record in records:
+            by_token[record["token"]].append(record)
+
+        failed = []
+        for token, group in by_token.items():
+            try:
+                results = await self.history_client.add_history_records(
+                    token=token,
+                    concept_details_list=[r["concept_details"] for r in group],
+                    idempotency_keys=[r["idempotency_key"] for r in group],
+                )
+            except Exception as e:
+                logger.error(f"Error delivering history batch: {str(e)}")
+                results = [None] * len(group)
+
+            rejected = 0
+            for record, result in zip(group, results):
+                if result is False:
+                    # Permanent rejection (e.g. 403, 422): retrying cannot help
+                    record["delivered"] = True
+                    rejected += 1
+                elif result is None:
+                    record["attempts"] += 1
+                    failed.append(record)
+                else:
+                    record["delivered"] = True
+                    self._delivered += 1
+            if rejected:
+                self._rejected += rejected
+                logger.error(f"History service rejected {rejected} records, dropping")
+        return failed
+
+    async def _deliver(self, records: List[Dict[str, Any]]):
+        """Send records, retrying with backoff, and spill what still fails."""
+        pending = records
+        while pending:
+            pending = await self._send(pending)
+            retry = [r for r in pending if r["attempts"] < self.config.max_attempts]
+            exhausted = [
+                r for r in pending if r["attempts"] >= self.config.max_attempts
+            ]
+            if exhausted:
+                self._spill(exhausted)
+            if not retry:
+                return
+            self._retried += len(retry)
+            attempt = max(r["attempts"] for r in retry)
+            await asyncio.sleep(self.config.retry_delay * (2 ** (attempt - 1)))
+            pending = retry
+
+    async def _run(self):
+        # On cancellation, undelivered records stay in `_in_hand` for stop()
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._deliver(batch)
+            except Exception as e:
+                logger.error(f"History worker error: {str(e)}")
+                self._spill([r for r in batch if not r.get("delivered")])
+            self._in_hand = []
+
+    def _spill(self, records: List[Dict[str, Any]]) -> bool:
+        """Append records to the spill file. Returns False if they were dropped."""
+        if not records:
+            return True
+        if not self.config.spill_path:
+            self._dropped += len(records)
+            logger.error(f"Dropped {len(records)} history records (no spill file)")
+            return False
+        try:
+            fd = os.open(
+                self.config.spill_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600
+            )
+            # The mode above only applies to new files and is masked by umask
+            os.fchmod(fd, 0o600)
+            with os.fdopen(fd, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(
+                        json.dumps(
+                            {
+                                "token": record["token"],
+                                "concept_details": record["concept_details"],
+                                "idempotency_key": record["idempotency_key"],
+                                "attempts": 0,
+                            }
+                        )
+                        + "\n"
+                    )
+            self._spilled += len(records)
+            logger.warning(f"Spilled {len(records)} history records to disk")
+            return True
+        except OSError as e:
+            self._dropped += len(records)
+            logger.error(f"Failed to spill history records: {str(e)}")
+            return False
+
+    def _take_spilled(self) -> List[Dict[str, Any]]:
+        path = self.config.spill_path
+        if not path or not os.path.exists(path):
+            return []
+        replay_path = f"{path}.replay"
+        try:
+            os.replace(path, replay_path)
+            with open(replay_path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            os.remove(replay_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read spilled history records: {str(e)}")
+            return []
+        return records
+
+    async def _replay_spilled(self):
+        while True:
+            records = await asyncio.to_thread(self._take_spilled)
+            live = [r for r in records if not token_expired(r["token"])]
+            self._dropped += len(records) - len(live)
+            for record in live:
+                # Spilled by a version without idempotency keys
+                record.setdefault("idempotency_key", uuid.uuid4().hex)
+                try:
+                    self._queue.put_nowait(record)
+                    self._replayed += 1
+                except asyncio.QueueFull:
+                    self._spill([record])
+            if live:
+                logger.info(f"Replaying {len(live)} spilled history records")
+            await asyncio.sleep(self.config.spill_retry_interval)
+
+    def start(self):
+        """Start the delivery worker and the spill replayer."""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        if self._replayer is None:
+            self._replayer = asyncio.create_task(self._replay_spilled())
+
+    async def stop(self):
+        """Stop the background tasks and flush queued records, spilling the rest."""
+        for task in (self._replayer, self._worker):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._worker = None
+        self._replayer = None
+
+        remaining = [r for r in self._in_hand if not r.get("delivered")]
+        self._in_hand = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        if not remaining:
+            return
+
+        logger.info(f"Flushing {len(remaining)} queued history records")
+        try:
+            failed = await asyncio.wait_for(
+                self._send(remaining), timeout=self.config.flush_timeout
+            )
+        except asyncio.TimeoutError:
+            # Records stored before the timeout must not be replayed
+            failed = [r for r in remaining if not r.get("delivered")]
+        if failed:
+            self._spill(failed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and delivery counters."""
+        return {
+            "queued": self._queue.qsize(),
+            "max_size": self.config.max_size,
+            "enqueued": self._enqueued,
+            "delivered": self._delivered,
+            "retried": self._retried,
+            "spilled": self._spilled,
+            "replayed": self._replayed,
+            "dropped": self._dropped,
+            "rejected": self._rejected,
+        }
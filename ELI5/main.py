@@ -1,18 +1,29 @@
 # Import necessary libraries
+import asyncio
 import random
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from google import genai
-from google.genai import types
 from pydantic import BaseModel
 import os
+import json
 from dotenv import load_dotenv
 import logging
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from contextlib import asynccontextmanager
 
 # Import service clients for inter-microservice communication
 from service_clients import auth_client, history_client, cleanup_clients
+from generation import GenerationConfig, GenerationPool, SingleFlight
+from rate_limiter import Priority, RateLimiter, RateLimiterConfig, is_rate_limited
+from circuit_breaker import CircuitBreaker, CircuitBreakerConfig
+from token_cache import TokenCacheConfig, TokenValidator
+from history_queue import HistoryQueueConfig, HistoryWriteBehind
+from explanation_pool import ExplanationPool, ExplanationPoolConfig
+from explanation_cache import ExplanationCache, ExplanationCacheConfig
+from deadlines import DeadlineMiddleware
+from fast_json import FastJSONRoute
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -31,21 +42,45 @@ try:
     client = genai.Client(api_key=api_key)
     logger.info("Gemini API client initialized successfully")
 except Exception as e:
+    client = None
     logger.error(f"Failed to initialize Gemini API client: {str(e)}")
 
+# Bounded pool for Gemini calls so generations never block the event loop
+generation_config = GenerationConfig()
+# Outbound Gemini budget, shared by every generation path
+rate_limiter = RateLimiter(RateLimiterConfig())
+# Fails Gemini calls fast while the API is erroring or too slow; 429s are
+# left to the rate limiter
+gemini_breaker = CircuitBreaker(
+    "gemini", CircuitBreakerConfig(), ignore=is_rate_limited
+)
+generation_pool = GenerationPool(
+    client, generation_config, rate_limiter, gemini_breaker
+)
+# Concurrent requests for the same concept share one in-flight generation
+generation_flights = SingleFlight()
+
 
 # Initialize FastAPI app with lifespan for cleanup
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting ELI5 service...")
+    history_queue.start()
+    if api_key:
+        explanation_pool.start()
     yield
     # Shutdown
     logger.info("Shutting down ELI5 service...")
+    await explanation_pool.stop()
+    await history_queue.stop()
+    explanation_cache.close()
     await cleanup_clients()
 
 
 app = FastAPI(title="LearnInFive API", lifespan=lifespan)
+# Render JSON with orjson when FAST_JSON_RESPONSES is on
+app.router.route_class = FastJSONRoute
 
 
 # List of Computer Science Concepts
@@ -90,6 +125,9 @@ origins = [
     "https://eli5-client.vercel.app",  # Production
 ]
 
+# Abandon work whose caller has stopped waiting for it
+app.add_middleware(DeadlineMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -117,6 +155,95 @@ def generate_prompt(concept):
     )
 
 
+def load_fallback_explanations() -> Dict[str, str]:
+    """Load the bundled per-concept explanations served while Gemini is down."""
+    path = os.path.join(os.path.dirname(__file__), "fallback_explanations.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to load fallback explanations: {str(e)}")
+        return {}
+
+
+FALLBACK_EXPLANATIONS = load_fallback_explanations()
+
+
+# Persistent cache of generated explanations, shared by both explain endpoints
+explanation_cache = ExplanationCache(ExplanationCacheConfig())
+
+
+async def generate_live_explanation(
+    concept: str, priority: Priority = Priority.ANONYMOUS
+) -> str:
+    """Generate a fresh explanation for a concept with Gemini and cache it."""
+    prompt = generate_prompt(concept)
+    model = generation_config.model
+    explanation = await generation_pool.generate(prompt, model, priority)
+    await explanation_cache.set(concept, model, prompt, explanation)
+    return explanation
+
+
+# Warm pool of ready explanations, refilled in the background
+explanation_pool = ExplanationPool(
+    CS_CONCEPTS,
+    lambda concept: generate_live_explanation(concept, Priority.BACKGROUND),
+    ExplanationPoolConfig(),
+)
+
+
+async def get_explanation(concept: str, priority: Priority = Priority.ANONYMOUS) -> str:
+    """
+    Serve an explanation from the warm pool, then the persistent cache,
+    falling back to live generation when both miss. Concurrent live
+    generations for the same concept and model are coalesced into one.
+    If live generation fails or the breaker is open, a degraded
+    explanation is served instead.
+    """
+    explanation = explanation_pool.pop(concept)
+    if explanation is not None:
+        logger.info(f"Served explanation for {concept} from the pool")
+        return explanation
+
+    explanation = await explanation_cache.get(
+        concept, generation_config.model, generate_prompt(concept)
+    )
+    if explanation is not None:
+        logger.info(f"Served explanation for {concept} from the cache")
+        return explanation
+
+    try:
+        return await generation_flights.do(
+            (concept, generation_config.model),
+            lambda: generate_live_explanation(concept, priority),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.warning(f"Live generation unavailable for {concept}: {str(e)}")
+        return await get_degraded_explanation(concept)
+
+
+async def get_degraded_explanation(concept: str) -> str:
+    """
+    Serve the last good cached explanation for a concept, or the bundled
+    fallback, when Gemini is unavailable or the circuit breaker is open.
+    """
+    explanation = await explanation_cache.get_latest(concept)
+    if explanation is not None:
+        logger.info(f"Served last good cached explanation for {concept}")
+        return explanation
+
+    explanation = FALLBACK_EXPLANATIONS.get(concept)
+    if explanation is not None:
+        logger.info(f"Served bundled fallback explanation for {concept}")
+        return explanation
+
+    raise HTTPException(
+        status_code=503, detail="Explanation service is temporarily unavailable"
+    )
+
+
 # API endpoint to explain a concept
 @app.get("/api/explain", response_model=ConceptResponse)
 async def explain_concept():
@@ -133,47 +260,47 @@ async def explain_concept():
     try:
         logger.info(f"Generating explanation for concept: {concept}")
 
-        # Create the prompt
-        prompt = generate_prompt(concept)
-
-        # Set up the model and contents according to the new API format
-        model = os.getenv(
-            "GEMINI_MODEL", "gemini-pro"
-        )  # Using gemini-pro as the default model
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_text(text=prompt),
-                ],
-            ),
-        ]
-
-        # Configure the generation parameters
-        generate_content_config = types.GenerateContentConfig(
-            response_mime_type="text/plain",
-        )
-
-        # Generate content
-        response = client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        )
+        # Take a pre-generated explanation or generate one without blocking
+        explanation = await get_explanation(concept)
 
         logger.info("Successfully generated content from Gemini API")
 
         # Return the response with the markdown content
-        return {"concept": concept, "explanation": response.text}
+        return {"concept": concept, "explanation": explanation}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating explanation: {str(e)}")
         # Return a more graceful error while still providing useful information
         raise HTTPException(
             status_code=500,
-            detail=f"Error generating explanation. Please check your API key and network connection. Error: {str(e)}",
+            detail="Error generating explanation. Please try again later.",
         )
 
 
+# Generation and pool usage, for sizing the concurrency and pool settings
+@app.get("/api/metrics")
+async def get_metrics():
+    """
+    Report internal usage counters for the ELI5 service.
+    """
+    return {
+        "generation": generation_pool.stats(),
+        "coalescing": generation_flights.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "circuit_breaker": gemini_breaker.stats(),
+        "hedging": generation_pool.hedging.stats(),
+        "token_cache": token_validator.stats(),
+        "history_queue": history_queue.stats(),
+        "explanation_pool": explanation_pool.stats(),
+        "explanation_cache": await explanation_cache.stats(),
+        "service_clients": {
+            "auth": auth_client.stats(),
+            "history": history_client.stats(),
+        },
+    }
+
+
 # Fallback endpoint with the markdown example you provided
 @app.get("/api/fallback-explain", response_model=ConceptResponse)
 async def fallback_explain_concept():
@@ -237,7 +364,19 @@ print(sorted_toys_list) # The computer will show us the toys in order!
 """
 
 
+# Verifies tokens locally and caches validated users until their token expires
+token_validator = TokenValidator(auth_client, TokenCacheConfig())
+
+
 # Authentication dependency
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """The token of a "Bearer <token>" header, or None if malformed."""
+    parts = (authorization or "").split()
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        return None
+    return parts[1]
+
+
 async def get_current_user(authorization: Optional[str] = Header(None)):
     """
     Dependency to get current authenticated user from JWT token.
@@ -251,17 +390,15 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
         )
 
     try:
-        # Extract token from "Bearer <token>" format
-        parts = authorization.split()
-        if len(parts) != 2 or parts[0].lower() != "bearer":
+        token = bearer_token(authorization)
+        if token is None:
             raise HTTPException(
                 status_code=401,
                 detail="Invalid authorization header format",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        token = parts[1]
-        user_data = await auth_client.validate_token(token)
+        user_data = await token_validator.validate(token)
 
         if not user_data:
             raise HTTPException(
@@ -300,6 +437,14 @@ class AuthenticatedConceptResponse(ConceptResponse):
     saved_to_history: bool = False
 
 
+class BatchConceptResponse(BaseModel):
+    explanations: List[ConceptResponse]
+
+
+class AuthenticatedBatchConceptResponse(BaseModel):
+    explanations: List[AuthenticatedConceptResponse]
+
+
 # User registration endpoint
 @app.post("/api/auth/signup")
 async def signup_user(user: UserCreate):
@@ -336,9 +481,18 @@ async def login_user(user: UserLogin):
 
 # Get user history endpoint
 @app.get("/api/history")
-async def get_user_history(current_user: dict = Depends(get_current_user)):
+async def get_user_history(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[int] = Query(None),
+    summary: bool = Query(True),
+    current_user: dict = Depends(get_current_user),
+):
     """
-    Get the authenticated user's concept history.
+    Get one page of the authenticated user's concept history, newest first.
+    Pass the returned `next_cursor` as `cursor` to fetch the following page.
+    By default each entry is a summary (id, timestamp, concept, model); fetch
+    `/api/history/{record_id}` for the full explanation, or pass
+    `summary=false` to get full records in the listing.
     """
     try:
         user_id = current_user.get("id")
@@ -350,9 +504,14 @@ async def get_user_history(current_user: dict = Depends(get_current_user)):
         history = await history_client.get_user_history(
             token=current_user.get("token"),  # We'll need to modify auth dependency
             user_id=user_id,
+            limit=limit,
+            cursor=cursor,
+            summary=summary,
         )
 
-        return {"history": history or []}
+        if history is None:
+            return {"history": [], "next_cursor": None}
+        return {"history": history["records"], "next_cursor": history["next_cursor"]}
     except HTTPException:
         raise
     except Exception as e:
@@ -360,67 +519,125 @@ async def get_user_history(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail="Failed to get history")
 
 
+@app.get("/api/history/{record_id}")
+async def get_history_record(
+    record_id: int, current_user: dict = Depends(get_current_user)
+):
+    """
+    Get a single entry of the authenticated user's history with its full
+    explanation.
+    """
+    try:
+        user_id = current_user.get("id")
+        if not user_id:
+            raise HTTPException(status_code=400, detail="User ID not found")
+
+        record = await history_client.get_history_record(
+            token=current_user.get("token"), user_id=user_id, record_id=record_id
+        )
+        if record is None:
+            raise HTTPException(status_code=500, detail="Failed to get history")
+        return record
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting history record: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get history")
+
+
+def build_concept_details(concept: str, explanation: str) -> Dict[str, Any]:
+    """History payload for a generated explanation."""
+    return {
+        "concept": concept,
+        "explanation": explanation,
+        "model_used": generation_config.model,
+        "prompt": generate_prompt(concept),
+    }
+
+
+# History records are queued and delivered in batches by a background worker
+history_queue = HistoryWriteBehind(history_client, HistoryQueueConfig())
+
+
+def save_to_history(current_user: dict, concept: str, explanation: str) -> bool:
+    """
+    Queue a generated explanation for saving to the user's history.
+    Returns whether the record was queued; failures never fail the request.
+    """
+    try:
+        return history_queue.enqueue(
+            token=current_user.get("token"),
+            concept_details=build_concept_details(concept, explanation),
+        )
+    except Exception as history_error:
+        logger.error(f"Error queueing history record: {str(history_error)}")
+        # Don't fail the request if history saving fails
+        return False
+
+
+def save_batch_to_history(
+    current_user: dict, explanations: List[Dict[str, str]]
+) -> List[bool]:
+    """
+    Queue several generated explanations for saving to the user's history.
+    Returns whether each record was queued, in order.
+    """
+    return [
+        save_to_history(current_user, item["concept"], item["explanation"])
+        for item in explanations
+    ]
+
+
 # Updated explain endpoint with authentication (optional)
 @app.get("/api/explain/authenticated", response_model=AuthenticatedConceptResponse)
-async def explain_concept_authenticated(current_user: dict = Depends(get_current_user)):
+async def explain_concept_authenticated(
+    authorization: Optional[str] = Header(None),
+):
     """
     Generate concept explanation for authenticated users and save to history.
+
+    When the token can be verified locally, generation starts speculatively
+    while the auth service confirms the user, and the result is discarded if
+    that fails. Otherwise nothing is generated until the token is validated,
+    so unauthenticated callers cannot spend the authenticated lane. The
+    history record is queued for write-behind delivery, so
+    `saved_to_history` reports that the explanation was queued for saving.
     """
     concept = random.choice(CS_CONCEPTS)
     logger.info(f"Generating authenticated explanation for concept: {concept}")
 
     if not api_key:
+        await get_current_user(authorization)
         logger.error("API request made without a valid API key")
         raise HTTPException(status_code=500, detail="API key not configured")
 
-    try:
-        # Generate explanation (same logic as before)
-        prompt = generate_prompt(concept)
-        model = os.getenv("GEMINI_MODEL", "gemini-pro")
-        contents = [
-            types.Content(
-                role="user",
-                parts=[types.Part.from_text(text=prompt)],
-            ),
-        ]
-
-        generate_content_config = types.GenerateContentConfig(
-            response_mime_type="text/plain",
-        )
-
-        response = client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
+    token = bearer_token(authorization)
+    if token is not None and token_validator.verified_locally(token):
+        # Generate explanation ahead of anonymous traffic, overlapping the
+        # auth service round trip
+        generation = asyncio.ensure_future(
+            get_explanation(concept, Priority.AUTHENTICATED)
         )
-
-        explanation = response.text
-        logger.info("Successfully generated content from Gemini API")
-
-        # Save to history
-        saved_to_history = False
         try:
-            concept_details = {
-                "concept": concept,
-                "explanation": explanation,
-                "model_used": model,
-                "prompt": prompt,
-            }
-
-            history_result = await history_client.add_history_record(
-                token=current_user.get("token"),  # We'll modify this
-                concept_details=concept_details,
+            current_user = await get_current_user(authorization)
+        except BaseException:
+            generation.cancel()
+            # Retrieve the outcome so a failed generation is not logged as
+            # "Task exception was never retrieved"
+            generation.add_done_callback(
+                lambda task: task.cancelled() or task.exception()
             )
+            raise
+    else:
+        current_user = await get_current_user(authorization)
+        generation = get_explanation(concept, Priority.AUTHENTICATED)
 
-            saved_to_history = history_result is not None
-            if saved_to_history:
-                logger.info("Successfully saved concept to user history")
-            else:
-                logger.warning("Failed to save concept to history")
+    try:
+        explanation = await generation
+        logger.info("Successfully generated content from Gemini API")
 
-        except Exception as history_error:
-            logger.error(f"Error saving to history: {str(history_error)}")
-            # Don't fail the request if history saving fails
+        # Queue the history record; delivery happens off the request path
+        saved_to_history = save_to_history(current_user, concept, explanation)
 
         return {
             "concept": concept,
@@ -428,9 +645,250 @@ async def explain_concept_authenticated(current_user: dict = Depends(get_current
             "saved_to_history": saved_to_history,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating explanation: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Error generating explanation: {str(e)}",
+            detail="Error generating explanation. Please try again later.",
+        )
+
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format a Server-Sent Event with a JSON payload."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+async def stream_explanation(
+    concept: str, priority: Priority = Priority.ANONYMOUS
+) -> AsyncIterator[str]:
+    """
+    Yield explanation text for a concept as it becomes available.
+    Pooled or cached explanations are sent as a single chunk; otherwise the
+    Gemini output is streamed and cached once complete. If generation fails
+    before any chunk was sent, a degraded explanation is sent instead.
+    """
+    explanation = explanation_pool.pop(concept)
+    if explanation is None:
+        explanation = await explanation_cache.get(
+            concept, generation_config.model, generate_prompt(concept)
         )
+    if explanation is not None:
+        yield explanation
+        return
+
+    prompt = generate_prompt(concept)
+    model = generation_config.model
+    chunks = []
+    try:
+        async for chunk in generation_pool.stream(prompt, model, priority):
+            chunks.append(chunk)
+            yield chunk
+    except HTTPException:
+        raise
+    except Exception as e:
+        if chunks:
+            raise
+        logger.warning(f"Live generation unavailable for {concept}: {str(e)}")
+        yield await get_degraded_explanation(concept)
+        return
+    await explanation_cache.set(concept, model, prompt, "".join(chunks))
+
+
+async def explanation_events(
+    concept: str, current_user: Optional[dict] = None
+) -> AsyncIterator[str]:
+    """
+    Stream an explanation as SSE: a `concept` event, one `data` event per
+    chunk, then a `done` event. For authenticated users the assembled text
+    is saved to history before `done` is sent.
+    """
+    yield sse_event({"concept": concept}, event="concept")
+
+    priority = Priority.ANONYMOUS if current_user is None else Priority.AUTHENTICATED
+    chunks = []
+    try:
+        async for chunk in stream_explanation(concept, priority):
+            chunks.append(chunk)
+            yield sse_event({"text": chunk})
+    except Exception as e:
+        logger.error(f"Error streaming explanation: {str(e)}")
+        yield sse_event({"detail": "Error generating explanation"}, event="error")
+        return
+
+    logger.info("Successfully streamed content from Gemini API")
+
+    done: Dict[str, Any] = {"concept": concept}
+    if current_user is not None:
+        done["saved_to_history"] = save_to_history(
+            current_user, concept, "".join(chunks)
+        )
+    yield sse_event(done, event="done")
+
+
+def explanation_stream_response(
+    current_user: Optional[dict] = None,
+) -> StreamingResponse:
+    concept = random.choice(CS_CONCEPTS)
+    logger.info(f"Streaming explanation for concept: {concept}")
+
+    if not api_key:
+        logger.error("API request made without a valid API key")
+        raise HTTPException(status_code=500, detail="API key not configured")
+
+    return StreamingResponse(
+        explanation_events(concept, current_user),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Streaming explain endpoint (Server-Sent Events)
+@app.get("/api/explain/stream")
+async def explain_concept_stream():
+    """
+    Stream a concept explanation as Server-Sent Events while it is generated.
+    """
+    return explanation_stream_response()
+
+
+@app.get("/api/explain/stream/authenticated")
+async def explain_concept_stream_authenticated(
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Stream a concept explanation for authenticated users and save the
+    assembled text to history once the stream completes.
+    """
+    return explanation_stream_response(current_user)
+
+
+async def explain_one(
+    concept: str, priority: Priority = Priority.ANONYMOUS
+) -> Dict[str, str]:
+    explanation = await get_explanation(concept, priority)
+    return {"concept": concept, "explanation": explanation}
+
+
+def pick_batch_concepts(n: int) -> List[str]:
+    concepts = random.sample(CS_CONCEPTS, n)
+    logger.info(f"Randomly selected batch of concepts: {concepts}")
+
+    if not api_key:
+        logger.error("API request made without a valid API key")
+        raise HTTPException(status_code=500, detail="API key not configured")
+    return concepts
+
+
+async def generate_batch(
+    concepts: List[str], priority: Priority = Priority.ANONYMOUS
+) -> List[Dict[str, str]]:
+    """
+    Generate explanations for several concepts concurrently. Each generation
+    still goes through the generation pool, so the concurrency cap applies.
+    Concepts that fail are dropped; the batch fails only if all of them do.
+    """
+    results = await asyncio.gather(
+        *(explain_one(concept, priority) for concept in concepts),
+        return_exceptions=True,
+    )
+
+    explanations = []
+    errors = []
+    for concept, result in zip(concepts, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Error generating explanation for {concept}: {str(result)}")
+            errors.append(result)
+        else:
+            explanations.append(result)
+
+    if not explanations:
+        # Surface busy/queue-full responses as-is so clients can back off
+        for error in errors:
+            if isinstance(error, HTTPException):
+                raise error
+        raise HTTPException(status_code=500, detail="Error generating explanations")
+    return explanations
+
+
+async def batch_events(
+    concepts: List[str], current_user: Optional[dict] = None
+) -> AsyncIterator[str]:
+    """
+    Stream a batch as SSE: one `explanation` event per concept as soon as it
+    finishes, then a `done` event. For authenticated users every explanation
+    is saved to history in one pass before `done` is sent.
+    """
+    priority = Priority.ANONYMOUS if current_user is None else Priority.AUTHENTICATED
+    explanations = []
+    for next_done in asyncio.as_completed([explain_one(c, priority) for c in concepts]):
+        try:
+            item = await next_done
+        except Exception as e:
+            logger.error(f"Error generating batch explanation: {str(e)}")
+            yield sse_event({"detail": "Error generating explanation"}, event="error")
+            continue
+        explanations.append(item)
+        yield sse_event(item, event="explanation")
+
+    done: Dict[str, Any] = {"count": len(explanations)}
+    if current_user is not None and explanations:
+        saved = save_batch_to_history(current_user, explanations)
+        done["saved_to_history"] = sum(saved)
+    yield sse_event(done, event="done")
+
+
+def batch_stream_response(
+    concepts: List[str], current_user: Optional[dict] = None
+) -> StreamingResponse:
+    return StreamingResponse(
+        batch_events(concepts, current_user),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Batch explain endpoint
+@app.get("/api/explain/batch", response_model=BatchConceptResponse)
+async def explain_concept_batch(
+    n: int = Query(3, ge=1, le=len(CS_CONCEPTS)),
+    stream: bool = False,
+):
+    """
+    Explain `n` distinct concepts generated concurrently.
+    - **n**: Number of concepts to explain.
+    - **stream**: Send each explanation as a Server-Sent Event as soon as it is ready.
+    """
+    concepts = pick_batch_concepts(n)
+    if stream:
+        return batch_stream_response(concepts)
+    return {"explanations": await generate_batch(concepts)}
+
+
+@app.get(
+    "/api/explain/batch/authenticated",
+    response_model=AuthenticatedBatchConceptResponse,
+)
+async def explain_concept_batch_authenticated(
+    n: int = Query(3, ge=1, le=len(CS_CONCEPTS)),
+    stream: bool = False,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Explain `n` distinct concepts for authenticated users and save all of
+    them to history in one pass.
+    """
+    concepts = pick_batch_concepts(n)
+    if stream:
+        return batch_stream_response(concepts, current_user)
+
+    explanations = await generate_batch(concepts, Priority.AUTHENTICATED)
+    saved = save_batch_to_history(current_user, explanations)
+    return {
+        "explanations": [
+            {**item, "saved_to_history": saved_to_history}
+            for item, saved_to_history in zip(explanations, saved)
+        ]
+    }
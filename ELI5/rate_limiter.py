@@ -0,0 +1,206 @@
+"""
+Outbound rate limiting for Gemini API calls.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import logging
+import time
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Priority lanes for Gemini calls; lower values are served first."""
+
+    AUTHENTICATED = 0
+    ANONYMOUS = 1
+    BACKGROUND = 2
+
+
+class RateLimiterConfig:
+    """Configuration for the Gemini rate limiter."""
+
+    def __init__(self):
+        # Request and token budgets per minute
+        self.rpm = float(os.getenv("GEMINI_RPM", "60"))
+        self.tpm = float(os.getenv("GEMINI_TPM", "1000000"))
+        # Token estimate charged up front, corrected once usage is known
+        self.tokens_per_request = int(os.getenv("GEMINI_TOKENS_PER_REQUEST", "2000"))
+        # Share of the budget held back from lower-priority lanes
+        self.reserve_fraction = float(os.getenv("GEMINI_PRIORITY_RESERVE", "0.2"))
+        # How long a call may wait for budget before giving up (seconds)
+        self.max_wait = float(os.getenv("GEMINI_LIMITER_MAX_WAIT", "30.0"))
+        # Retries after a 429 and the backoff used when no retry delay is given
+        self.max_retries = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+        self.retry_base_delay = float(os.getenv("GEMINI_RETRY_BASE_DELAY", "1.0"))
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, reserve: float = 0.0) -> float:
+        """Seconds until `amount` can be taken while leaving `reserve` behind."""
+        self._refill()
+        needed = min(amount + reserve, self.capacity) - self.tokens
+        return max(needed, 0.0) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether `error` is Gemini rejecting a call for quota (429)."""
+    return (
+        getattr(error, "code", None) == 429
+        or getattr(error, "status", None) == "RESOURCE_EXHAUSTED"
+    )
+
+
+def retry_after_seconds(error: Any) -> Optional[float]:
+    """Extract the server-suggested retry delay from a 429 error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        retry_after = headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+
+    # Gemini reports the delay as a RetryInfo detail, e.g. "retryDelay": "30s"
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []) or []:
+            delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            if isinstance(delay, str) and delay.endswith("s"):
+                try:
+                    return float(delay[:-1])
+                except ValueError:
+                    pass
+    return None
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter with RPM and TPM budgets and priority lanes.
+    Waiting calls are served strictly in priority order, and lower-priority
+    lanes cannot dip into the reserved share of the budget, so authenticated
+    traffic wins when the budget is tight. A 429 pauses all lanes for the
+    server's retry delay.
+    """
+
+    def __init__(self, config: RateLimiterConfig):
+        self.config = config
+        self._requests = TokenBucket(config.rpm)
+        self._tokens = TokenBucket(config.tpm)
+        self._blocked_until = 0.0
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = asyncio.Condition()
+
+        self._granted: Dict[str, int] = {p.name.lower(): 0 for p in Priority}
+        self._timeouts = 0
+        self._throttled = 0
+
+    def _wait_time(self, priority: Priority) -> float:
+        reserve = (
+            self.config.reserve_fraction if priority > Priority.AUTHENTICATED else 0
+        )
+        return max(
+            self._requests.wait_time(1, reserve * self._requests.capacity),
+            self._tokens.wait_time(
+                self.config.tokens_per_request, reserve * self._tokens.capacity
+            ),
+            self._blocked_until - time.monotonic(),
+        )
+
+    async def acquire(self, priority: Priority = Priority.ANONYMOUS):
+        """Wait for budget for one call, raising 429 if it does not come in time."""
+        entry = (int(priority), next(self._sequence))
+        deadline = time.monotonic() + self.config.max_wait
+        heapq.heappush(self._waiters, entry)
+        try:
+            async with self._condition:
+                while True:
+                    wait = None
+                    if self._waiters[0] == entry:
+                        wait = self._wait_time(priority)
+                        if wait <= 0:
+                            self._requests.take(1)
+                            self._tokens.take(self.config.tokens_per_request)
+                            self._granted[priority.name.lower()] += 1
+                            return
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        logger.warning(f"Gemini budget exhausted for {priority.name}")
+                        raise HTTPException(
+                            status_code=429,
+                            detail="Explanation service is busy, please try again shortly",
+                            headers={"Retry-After": str(int(wait or 1) + 1)},
+                        )
+                    timeout = remaining if wait is None else min(wait, remaining)
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            async with self._condition:
+                self._condition.notify_all()
+
+    def record_usage(self, total_tokens: Optional[int]):
+        """Correct the up-front token estimate with the actual usage."""
+        if total_tokens:
+            self._tokens.take(total_tokens - self.config.tokens_per_request)
+
+    def throttle(self, error: Any, attempt: int) -> float:
+        """
+        Record a 429 from Gemini and pause all lanes. Returns the delay,
+        taken from the server's retry hint or exponential backoff.
+        """
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = self.config.retry_base_delay * (2**attempt)
+        self._throttled += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        logger.warning(f"Gemini rate limited, pausing calls for {delay:.1f}s")
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget levels and per-lane counters."""
+        self._requests._refill()
+        self._tokens._refill()
+        return {
+            "rpm": self.config.rpm,
+            "tpm": self.config.tpm,
+            "requests_available": self._requests.tokens,
+            "tokens_available": self._tokens.tokens,
+            "waiting": len(self._waiters),
+            "granted": self._granted,
+            "timeouts": self._timeouts,
+            "throttled": self._throttled,
+            "blocked_for_seconds": max(self._blocked_until - time.monotonic(), 0.0),
+        }
@@ -2,12 +2,12 @@
 HTTP clients for communicating with other microservices.
 """
 
-import httpx
 import os
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 from fastapi import HTTPException
 
+from service_http import BaseServiceClient
 
 logger = logging.getLogger(__name__)
 
@@ -22,76 +22,10 @@ class ServiceConfig:
             "HISTORY_SERVICE_URL", "http://localhost:8002"
         )
 
-        # HTTP client timeout settings
-        self.timeout = float(os.getenv("HTTP_TIMEOUT", "30.0"))
-        self.max_retries = int(os.getenv("HTTP_MAX_RETRIES", "3"))
-
 
 config = ServiceConfig()
 
 
-class BaseServiceClient:
-    """Base class for all service clients with common HTTP functionality."""
-
-    def __init__(self, base_url: str):
-        self.base_url = base_url.rstrip("/")
-        self.client = httpx.AsyncClient(
-            timeout=config.timeout,
-            limits=httpx.Limits(max_keepalive_connections=5, max_connections=10),
-        )
-
-    async def _make_request(
-        self,
-        method: str,
-        endpoint: str,
-        headers: Optional[Dict[str, str]] = None,
-        json_data: Optional[Dict[str, Any]] = None,
-        data: Optional[Dict[str, Any]] = None,
-    ) -> httpx.Response:
-        """Make HTTP request with error handling and retries."""
-        url = f"{self.base_url}{endpoint}"
-        request_headers = headers or {}
-
-        for attempt in range(config.max_retries):
-            try:
-                logger.info(f"Making {method} request to {url} (attempt {attempt + 1})")
-
-                response = await self.client.request(
-                    method=method,
-                    url=url,
-                    headers=request_headers,
-                    json=json_data,
-                    data=data,
-                )
-
-                # Log response details
-                logger.info(f"Response status: {response.status_code} for {url}")
-
-                if response.status_code < 500:
-                    # Don't retry client errors (4xx), only server errors (5xx)
-                    return response
-
-            except (httpx.ConnectError, httpx.TimeoutException) as e:
-                logger.warning(f"Request attempt {attempt + 1} failed: {str(e)}")
-                if attempt == config.max_retries - 1:
-                    raise HTTPException(
-                        status_code=503, detail=f"Service unavailable: {self.base_url}"
-                    )
-            except Exception as e:
-                logger.error(f"Unexpected error in request: {str(e)}")
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Internal error communicating with service: {str(e)}",
-                )
-
-        # This should never be reached due to the raise in the loop
-        raise HTTPException(status_code=503, detail="Service communication failed")
-
-    async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
-
-
 class AuthServiceClient(BaseServiceClient):
     """Client for communicating with the Authentication Service."""
 
@@ -104,22 +38,31 @@ class AuthServiceClient(BaseServiceClient):
         Returns user data if token is valid, None otherwise.
         """
         try:
-            headers = {"Authorization": f"Bearer {token}"}
-            response = await self._make_request("GET", "/auth/me", headers=headers)
-
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 401:
-                logger.warning("Token validation failed: unauthorized")
-                return None
-            else:
-                logger.error(f"Auth service error: {response.status_code}")
-                return None
-
+            return await self.fetch_current_user(token)
         except Exception as e:
             logger.error(f"Error validating token: {str(e)}")
             return None
 
+    async def fetch_current_user(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch the user a JWT token belongs to from the auth service.
+        Returns None if the auth service rejects the token and raises
+        HTTPException if the auth service could not answer.
+        """
+        headers = {"Authorization": f"Bearer {token}"}
+        response = await self._make_request("GET", "/auth/me", headers=headers)
+
+        if response.status_code == 200:
+            return self._json(response)
+        elif response.status_code == 401:
+            logger.warning("Token validation failed: unauthorized")
+            return None
+        else:
+            logger.error(f"Auth service error: {response.status_code}")
+            raise HTTPException(
+                status_code=503, detail=f"Auth service error: {response.status_code}"
+            )
+
     async def create_user(
         self, username: str, email: str, password: str
     ) -> Optional[Dict[str, Any]]:
@@ -132,9 +75,9 @@ class AuthServiceClient(BaseServiceClient):
             )
 
             if response.status_code == 200:
-                return response.json()
+                return self._json(response)
             else:
-                error_detail = response.json().get("detail", "Unknown error")
+                error_detail = self._json(response).get("detail", "Unknown error")
                 logger.error(f"User creation failed: {error_detail}")
                 raise HTTPException(
                     status_code=response.status_code, detail=error_detail
@@ -155,12 +98,15 @@ class AuthServiceClient(BaseServiceClient):
                 "password": password,
             }
 
-            response = await self._make_request("POST", "/auth/login", data=form_data)
+            # Logging in has no side effects, so it is safe to retry
+            response = await self._make_request(
+                "POST", "/auth/login", data=form_data, idempotent=True
+            )
 
             if response.status_code == 200:
-                return response.json()
+                return self._json(response)
             else:
-                error_detail = response.json().get("detail", "Invalid credentials")
+                error_detail = self._json(response).get("detail", "Invalid credentials")
                 logger.warning(f"Login failed: {error_detail}")
                 raise HTTPException(
                     status_code=response.status_code, detail=error_detail
@@ -192,9 +138,11 @@ class HistoryServiceClient(BaseServiceClient):
             )
 
             if response.status_code == 200:
-                return response.json()
+                return self._json(response)
             else:
-                error_detail = response.json().get("detail", "Failed to add history")
+                error_detail = self._json(response).get(
+                    "detail", "Failed to add history"
+                )
                 logger.error(f"History creation failed: {error_detail}")
                 return None
 
@@ -202,16 +150,86 @@ class HistoryServiceClient(BaseServiceClient):
             logger.error(f"Error adding history record: {str(e)}")
             return None
 
-    async def get_user_history(self, token: str, user_id: int) -> Optional[list]:
-        """Get history records for a user."""
+    async def add_history_records(
+        self,
+        token: str,
+        concept_details_list: List[Dict[str, Any]],
+        idempotency_keys: Optional[List[str]] = None,
+    ) -> List[Union[Dict[str, Any], bool, None]]:
+        """
+        Add several history records for the authenticated user in one request.
+        Returns one entry per record: the stored record, False when the
+        history service rejected the batch for good (a 4xx other than 408
+        and 429, so resending cannot help), or None when it may succeed on a
+        retry. With `idempotency_keys`, resending records that were already
+        stored returns them instead of adding duplicates, so the request is
+        safe to retry.
+        """
         try:
             headers = {"Authorization": f"Bearer {token}"}
+            keys = idempotency_keys or [None] * len(concept_details_list)
+            batch_data = {
+                "records": [
+                    {"concept_details": concept_details, "idempotency_key": key}
+                    for concept_details, key in zip(concept_details_list, keys)
+                ]
+            }
+
             response = await self._make_request(
-                "GET", f"/history/{user_id}", headers=headers
+                "POST",
+                "/history/batch",
+                headers=headers,
+                json_data=batch_data,
+                idempotent=idempotency_keys is not None,
             )
 
             if response.status_code == 200:
-                return response.json()
+                return self._json(response)
+            else:
+                error_detail = self._json(response).get(
+                    "detail", "Failed to add history"
+                )
+                logger.error(f"History batch creation failed: {error_detail}")
+                permanent = 400 <= response.status_code < 500 and (
+                    response.status_code not in (408, 429)
+                )
+                result = False if permanent else None
+                return [result] * len(concept_details_list)
+
+        except Exception as e:
+            logger.error(f"Error adding history records: {str(e)}")
+            return [None] * len(concept_details_list)
+
+    async def get_user_history(
+        self,
+        token: str,
+        user_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[int] = None,
+        summary: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get one page of history records for a user, newest first.
+        Returns the records and the cursor for the next page, if any.
+        With `summary`, records carry only id, timestamp, concept and model.
+        """
+        try:
+            headers = {"Authorization": f"Bearer {token}"}
+            params: Dict[str, Any] = {"summary": "true"} if summary else {}
+            if limit is not None:
+                params["limit"] = limit
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = await self._make_request(
+                "GET", f"/history/{user_id}", headers=headers, params=params
+            )
+
+            if response.status_code == 200:
+                next_cursor = response.headers.get("X-Next-Cursor")
+                return {
+                    "records": self._json(response),
+                    "next_cursor": int(next_cursor) if next_cursor else None,
+                }
             elif response.status_code == 403:
                 logger.warning("Access denied to user history")
                 raise HTTPException(status_code=403, detail="Access denied")
@@ -225,6 +243,33 @@ class HistoryServiceClient(BaseServiceClient):
             logger.error(f"Error getting user history: {str(e)}")
             return None
 
+    async def get_history_record(
+        self, token: str, user_id: int, record_id: int
+    ) -> Optional[Dict[str, Any]]:
+        """Get a single history record with its full details."""
+        try:
+            headers = {"Authorization": f"Bearer {token}"}
+            response = await self._make_request(
+                "GET", f"/history/{user_id}/{record_id}", headers=headers
+            )
+
+            if response.status_code == 200:
+                return self._json(response)
+            elif response.status_code == 404:
+                raise HTTPException(status_code=404, detail="History record not found")
+            elif response.status_code == 403:
+                logger.warning("Access denied to history record")
+                raise HTTPException(status_code=403, detail="Access denied")
+            else:
+                logger.error(f"Failed to get history record: {response.status_code}")
+                return None
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting history record: {str(e)}")
+            return None
+
 
 # Global client instances - these will be initialized when the app starts
 auth_client = AuthServiceClient()
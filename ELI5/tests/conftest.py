@@ -0,0 +1,30 @@
+import os
+import sys
+
+# Service modules are imported flat, with shared/ on the path as in Docker
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(SERVICE_DIR), "shared"))
+sys.path.insert(0, SERVICE_DIR)
+
+# Module names more than one service uses
+SERVICE_MODULES = ("crud", "database", "main", "models", "schemas", "service_clients")
+
+
+def use_service_modules():
+    """
+    Put this service first on the path and forget another service's modules
+    of the same name, so the tests collected next import this service's own.
+    """
+    sys.path.remove(SERVICE_DIR)
+    sys.path.insert(0, SERVICE_DIR)
+    for name in SERVICE_MODULES:
+        module = sys.modules.get(name)
+        if module is not None and not module.__file__.startswith(SERVICE_DIR):
+            del sys.modules[name]
+
+
+use_service_modules()
+
+
+def pytest_collectstart(collector):
+    use_service_modules()
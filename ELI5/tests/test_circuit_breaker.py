@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitBreakerConfig, CircuitOpenError
+
+
+def breaker(**overrides) -> CircuitBreaker:
+    config = CircuitBreakerConfig()
+    config.window = 10
+    config.min_calls = 4
+    config.error_rate = 0.5
+    config.slow_call_seconds = 1.0
+    config.slow_call_rate = 0.5
+    config.open_seconds = 30.0
+    config.call_timeout = 1.0
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return CircuitBreaker("test", config)
+
+
+def test_stays_closed_below_min_calls():
+    circuit = breaker()
+    for _ in range(3):
+        circuit.record_failure()
+    assert circuit.state == CircuitBreaker.CLOSED
+
+
+def test_trips_on_error_rate():
+    circuit = breaker()
+    circuit.record_success(0.1)
+    circuit.record_success(0.1)
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.CLOSED
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        circuit.before_call()
+    assert circuit.stats()["rejected"] == 1
+
+
+def test_trips_on_slow_call_rate():
+    circuit = breaker()
+    for latency in (0.1, 0.1, 2.0, 2.0):
+        circuit.record_success(latency)
+    assert circuit.state == CircuitBreaker.OPEN
+
+
+def test_half_open_lets_one_probe_through():
+    circuit = breaker(open_seconds=0.0)
+    for _ in range(4):
+        circuit.record_failure()
+    circuit.before_call()
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        circuit.before_call()
+
+    circuit.record_success(0.1)
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert [t["to"] for t in circuit.stats()["transitions"]] == [
+        "open",
+        "half_open",
+        "closed",
+    ]
+
+
+def test_failed_probe_reopens():
+    circuit = breaker(open_seconds=0.0)
+    for _ in range(4):
+        circuit.record_failure()
+    circuit.before_call()
+    circuit.record_failure("still down")
+    assert circuit.state == CircuitBreaker.OPEN
+
+
+def test_call_records_outcomes():
+    async def run():
+        circuit = breaker()
+
+        async def ok():
+            return "done"
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        async def hang():
+            await asyncio.sleep(5)
+
+        assert await circuit.call(ok) == "done"
+        with pytest.raises(RuntimeError):
+            await circuit.call(fail)
+        circuit.config.call_timeout = 0.01
+        with pytest.raises(asyncio.TimeoutError):
+            await circuit.call(hang)
+        return circuit.stats()
+
+    stats = asyncio.run(run())
+    assert stats["window_calls"] == 3
+    assert stats["error_rate"] == pytest.approx(2 / 3)
@@ -0,0 +1,127 @@
+import asyncio
+import sqlite3
+
+from explanation_cache import ExplanationCache, ExplanationCacheConfig
+
+
+def cache(path, **overrides) -> ExplanationCache:
+    config = ExplanationCacheConfig()
+    config.path = str(path)
+    config.ttl = 60
+    config.max_entries = 10
+    config.access_flush_interval = 60
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return ExplanationCache(config)
+
+
+def test_entries_are_keyed_by_concept_model_and_prompt(tmp_path):
+    async def run():
+        explanations = cache(tmp_path / "cache.db")
+        await explanations.set("Loop", "gemini-pro", "prompt", "Loops repeat")
+        found = [
+            await explanations.get("Loop", "gemini-pro", "prompt"),
+            await explanations.get("Loop", "gemini-pro", "other prompt"),
+            await explanations.get("Loop", "other-model", "prompt"),
+            await explanations.get("Recursion", "gemini-pro", "prompt"),
+        ]
+        return found, await explanations.stats()
+
+    found, stats = asyncio.run(run())
+    assert found == ["Loops repeat", None, None, None]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["entries"] == 1
+
+
+def test_entries_survive_a_restart(tmp_path):
+    async def run():
+        first = cache(tmp_path / "cache.db")
+        await first.set("Loop", "m", "p", "Loops repeat")
+        first.close()
+        return await cache(tmp_path / "cache.db").get("Loop", "m", "p")
+
+    assert asyncio.run(run()) == "Loops repeat"
+
+
+def test_expired_entries_miss_but_stay_available_for_degrading(tmp_path):
+    async def run():
+        explanations = cache(tmp_path / "cache.db", ttl=0)
+        await explanations.set("Loop", "m", "p", "Loops repeat")
+        await asyncio.sleep(0.01)
+        return (
+            await explanations.get("Loop", "m", "p"),
+            await explanations.get_latest("Loop"),
+        )
+
+    assert asyncio.run(run()) == (None, "Loops repeat")
+
+
+def test_latest_explanation_ignores_model_and_prompt(tmp_path):
+    async def run():
+        explanations = cache(tmp_path / "cache.db")
+        await explanations.set("Loop", "old-model", "old prompt", "old")
+        await asyncio.sleep(0.01)
+        await explanations.set("Loop", "new-model", "new prompt", "new")
+        return await explanations.get_latest("Loop")
+
+    assert asyncio.run(run()) == "new"
+
+
+def test_eviction_keeps_recently_read_entries(tmp_path):
+    async def run():
+        explanations = cache(tmp_path / "cache.db", max_entries=2)
+        await explanations.set("a", "m", "p", "A")
+        await asyncio.sleep(0.01)
+        await explanations.set("b", "m", "p", "B")
+        await asyncio.sleep(0.01)
+        # The hit is only buffered, but must still count before evicting
+        await explanations.get("a", "m", "p")
+        await explanations.set("c", "m", "p", "C")
+        return [await explanations.get(c, "m", "p") for c in "abc"], (
+            await explanations.stats()
+        )
+
+    found, stats = asyncio.run(run())
+    assert found == ["A", None, "C"]
+    assert stats["evictions"] == 1
+
+
+def test_hits_do_not_write_until_flushed(tmp_path):
+    path = tmp_path / "cache.db"
+
+    def last_access():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT last_access FROM explanations").fetchone()[0]
+
+    async def run():
+        explanations = cache(path)
+        await explanations.set("Loop", "m", "p", "Loops repeat")
+        stored = last_access()
+        await asyncio.sleep(0.01)
+        await explanations.get("Loop", "m", "p")
+        after_hit = last_access()
+        explanations.close()
+        return stored, after_hit, last_access()
+
+    stored, after_hit, after_close = asyncio.run(run())
+    assert after_hit == stored
+    assert after_close > stored
+
+
+def test_cache_uses_write_ahead_logging(tmp_path):
+    explanations = cache(tmp_path / "cache.db")
+    mode = explanations._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_empty_path_disables_the_cache():
+    async def run():
+        explanations = cache("")
+        await explanations.set("Loop", "m", "p", "Loops repeat")
+        return await explanations.get("Loop", "m", "p"), await explanations.stats()
+
+    found, stats = asyncio.run(run())
+    assert found is None
+    assert stats["enabled"] is False
+    assert stats["entries"] == 0
@@ -0,0 +1,89 @@
+import asyncio
+
+from explanation_pool import ExplanationPool, ExplanationPoolConfig
+
+
+def config(size: int = 2, refill_per_minute: float = 60_000) -> ExplanationPoolConfig:
+    config = ExplanationPoolConfig()
+    config.size = size
+    config.refill_per_minute = refill_per_minute
+    config.error_backoff = 0.01
+    return config
+
+
+def numbered():
+    """Generator returning "<concept> <n>" for the n-th call overall."""
+    calls = []
+
+    async def generate(concept):
+        calls.append(concept)
+        return f"{concept} {len(calls)}"
+
+    return generate, calls
+
+
+def test_fills_every_concept_to_its_target_depth():
+    generate, calls = numbered()
+
+    async def run():
+        pool = ExplanationPool(["Loop", "Recursion"], generate, config())
+        pool.start()
+        await asyncio.sleep(0.1)
+        await pool.stop()
+        return pool.stats()
+
+    stats = asyncio.run(run())
+    assert stats["depth"] == {"Loop": 2, "Recursion": 2}
+    # Refills alternate between the emptiest pools, then stop
+    assert calls == ["Loop", "Recursion", "Loop", "Recursion"]
+
+
+def test_pop_serves_in_order_and_triggers_a_refill():
+    generate, calls = numbered()
+
+    async def run():
+        pool = ExplanationPool(["Loop"], generate, config())
+        pool.start()
+        await asyncio.sleep(0.05)
+        served = [pool.pop("Loop"), pool.pop("Loop"), pool.pop("Loop")]
+        await asyncio.sleep(0.05)
+        await pool.stop()
+        return served, pool.stats()
+
+    served, stats = asyncio.run(run())
+    assert served == ["Loop 1", "Loop 2", None]
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["depth"] == {"Loop": 2}
+    assert stats["refills"] == 4
+
+
+def test_unknown_concepts_and_a_disabled_pool_miss():
+    generate, _ = numbered()
+    pool = ExplanationPool(["Loop"], generate, config(size=0))
+    assert pool.pop("Loop") is None
+    assert ExplanationPool(["Loop"], generate, config()).pop("Graph") is None
+    pool.start()
+    assert pool._task is None
+
+
+def test_failed_refills_are_counted_and_retried():
+    attempts = []
+
+    async def flaky(concept):
+        attempts.append(concept)
+        if len(attempts) == 1:
+            raise RuntimeError("quota")
+        return concept
+
+    async def run():
+        pool = ExplanationPool(["Loop"], flaky, config(size=1))
+        pool.start()
+        await asyncio.sleep(0.1)
+        await pool.stop()
+        return pool.stats()
+
+    stats = asyncio.run(run())
+    assert stats["refill_errors"] == 1
+    assert stats["depth"] == {"Loop": 1}
+    assert len(attempts) == 2
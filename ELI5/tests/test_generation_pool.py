@@ -0,0 +1,286 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+from fastapi import HTTPException
+
+from circuit_breaker import CircuitBreaker, CircuitBreakerConfig, CircuitOpenError
+from generation import GenerationConfig, GenerationPool, HedgePolicy
+
+
+class FakeModels:
+    """Stands in for `client.aio.models`, answering after `delay` seconds."""
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def generate_content(self, model, contents, config):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return SimpleNamespace(text=f"explanation {self.calls}", usage_metadata=None)
+
+    async def generate_content_stream(self, model, contents, config):
+        await asyncio.sleep(self.delay)
+        return self.chunks()
+
+    async def chunks(self):
+        for text in ("Think ", "of ", "it ", "like..."):
+            await asyncio.sleep(self.delay)
+            yield SimpleNamespace(text=text)
+
+
+def pool(
+    models: FakeModels, breaker: Optional[CircuitBreaker] = None, **overrides
+) -> GenerationPool:
+    config = GenerationConfig()
+    config.max_concurrency = 2
+    config.max_waiting = 10
+    config.queue_timeout = 1.0
+    config.hedge_enabled = False
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    return GenerationPool(client, config, breaker=breaker)
+
+
+def breaker(call_timeout: float = 1.0) -> CircuitBreaker:
+    config = CircuitBreakerConfig()
+    config.min_calls = 1
+    config.call_timeout = call_timeout
+    return CircuitBreaker("test", config)
+
+
+def test_returns_the_response_text():
+    models = FakeModels()
+    assert asyncio.run(pool(models).generate("prompt", "model")) == "explanation 1"
+
+
+def test_calls_in_flight_are_bounded():
+    models = FakeModels()
+
+    async def run():
+        generation = pool(models)
+        await asyncio.gather(*(generation.generate("p", "m") for _ in range(6)))
+        return generation.stats()
+
+    stats = asyncio.run(run())
+    assert models.peak == 2
+    assert stats["completed"] == 6
+    assert stats["in_flight"] == 0
+    assert stats["waiting"] == 0
+
+
+def test_full_queue_rejects_with_503():
+    models = FakeModels(delay=0.05)
+
+    async def run():
+        generation = pool(models, max_concurrency=1, max_waiting=1)
+        return generation, await asyncio.gather(
+            *(generation.generate("p", "m") for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    generation, results = asyncio.run(run())
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1
+    assert rejected[0].status_code == 503
+    assert generation.stats()["rejected"] == 1
+    assert models.calls == 2
+
+
+def test_waiting_too_long_for_a_slot_rejects_with_503():
+    models = FakeModels(delay=0.2)
+
+    async def run():
+        generation = pool(models, max_concurrency=1, queue_timeout=0.02)
+        first = asyncio.ensure_future(generation.generate("p", "m"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as error:
+            await generation.generate("p", "m")
+        await first
+        return error.value
+
+    assert asyncio.run(run()).status_code == 503
+
+
+def test_failed_calls_free_their_slot():
+    class Failing(FakeModels):
+        async def generate_content(self, model, contents, config):
+            raise RuntimeError("boom")
+
+    async def run():
+        generation = pool(Failing(), max_concurrency=1)
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await generation.generate("p", "m")
+        return generation.stats()
+
+    assert asyncio.run(run())["in_flight"] == 0
+
+
+async def collect(generation: GenerationPool):
+    return [chunk async for chunk in generation.stream("p", "m")]
+
+
+def test_stream_yields_chunks_and_records_success():
+    circuit = breaker()
+    generation = pool(FakeModels(), circuit)
+    assert asyncio.run(collect(generation)) == ["Think ", "of ", "it ", "like..."]
+    assert generation.stats()["completed"] == 1
+    assert circuit.stats()["window_calls"] == 1
+    assert circuit.stats()["error_rate"] == 0
+
+
+def test_open_breaker_fails_fast():
+    circuit = breaker()
+    circuit.record_failure()
+    models = FakeModels()
+    generation = pool(models, circuit)
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(generation.generate("p", "m"))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(collect(generation))
+    assert models.calls == 0
+
+
+def test_hung_call_times_out_as_a_failure():
+    circuit = breaker(call_timeout=0.02)
+    generation = pool(FakeModels(delay=1.0), circuit)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(generation.generate("p", "m"))
+    assert circuit.state == CircuitBreaker.OPEN
+    assert generation.stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("stall", ["open", "chunk"])
+def test_stalled_stream_times_out_as_a_failure(stall):
+    class Stalling(FakeModels):
+        async def generate_content_stream(self, model, contents, config):
+            if stall == "open":
+                await asyncio.sleep(1.0)
+            return self.chunks()
+
+        async def chunks(self):
+            yield SimpleNamespace(text="Think ")
+            await asyncio.sleep(1.0)
+            yield SimpleNamespace(text="of ")
+
+    circuit = breaker(call_timeout=0.02)
+    generation = pool(Stalling(), circuit)
+    received = []
+
+    async def run():
+        async for chunk in generation.stream("p", "m"):
+            received.append(chunk)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    assert received == ([] if stall == "open" else ["Think "])
+    assert circuit.state == CircuitBreaker.OPEN
+    assert generation.stats()["in_flight"] == 0
+    assert generation._semaphore._value == generation.config.max_concurrency
+
+
+class Scripted(FakeModels):
+    """Answers the n-th call after `delays[n]` seconds."""
+
+    def __init__(self, *delays: float):
+        super().__init__()
+        self.delays = list(delays)
+
+    async def generate_content(self, model, contents, config):
+        self.delay = self.delays[self.calls]
+        return await super().generate_content(model, contents, config)
+
+
+def hedged(models: FakeModels, delay: float, **overrides) -> GenerationPool:
+    """Pool that hedges after `delay` seconds with budget for one hedge."""
+    generation = pool(
+        models,
+        hedge_enabled=True,
+        hedge_percentile=50,
+        hedge_budget=1.0,
+        hedge_min_samples=1,
+        **overrides,
+    )
+    generation.hedging.record_latency(delay)
+    return generation
+
+
+def test_hedge_policy_needs_samples_and_budget():
+    config = GenerationConfig()
+    config.hedge_enabled = True
+    config.hedge_percentile = 90
+    config.hedge_budget = 0.5
+    config.hedge_min_samples = 10
+    policy = HedgePolicy(config)
+    for latency in range(1, 10):
+        policy.record_latency(latency)
+    assert policy.delay() is None
+    policy.record_latency(10)
+    assert policy.delay() == 10
+
+    policy.earn()
+    assert not policy.try_spend()
+    policy.earn()
+    assert policy.try_spend()
+    assert policy.stats()["hedged"] == 1
+    assert policy.stats()["skipped_over_budget"] == 1
+
+    config.hedge_enabled = False
+    assert policy.delay() is None
+
+
+def test_slow_primary_loses_to_the_hedge():
+    models = Scripted(1.0, 0.01)
+
+    async def run():
+        generation = hedged(models, delay=0.02)
+        return await generation.generate("p", "m"), generation.hedging.stats()
+
+    text, stats = asyncio.run(run())
+    assert text == "explanation 2"
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
+    assert models.calls == 2
+
+
+def test_fast_primary_is_not_hedged():
+    models = Scripted(0.01)
+
+    async def run():
+        generation = hedged(models, delay=0.1)
+        return await generation.generate("p", "m"), generation.hedging.stats()
+
+    text, stats = asyncio.run(run())
+    assert text == "explanation 1"
+    assert stats["hedged"] == 0
+    assert models.calls == 1
+
+
+def test_queueing_for_a_slot_does_not_count_toward_the_hedge_delay():
+    models = Scripted(0.03)
+
+    async def run():
+        generation = hedged(models, delay=0.05, max_concurrency=1)
+        # Hold the only slot for longer than the hedge delay
+        await generation._semaphore.acquire()
+        asyncio.get_running_loop().call_later(0.1, generation._semaphore.release)
+        text = await generation.generate("p", "m")
+        return text, generation.hedging
+
+    text, hedging = asyncio.run(run())
+    assert text == "explanation 1"
+    assert hedging.stats()["hedged"] == 0
+    assert models.calls == 1
+    # The latency sample covers the call only, not the wait for a slot
+    assert hedging._latencies[-1] < 0.08
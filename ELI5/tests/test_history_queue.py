@@ -0,0 +1,197 @@
+import asyncio
+import json
+import os
+import stat
+import time
+
+from jose import jwt
+
+from history_queue import HistoryQueueConfig, HistoryWriteBehind
+
+
+def token(user_id: int, expires_in: float = 600) -> str:
+    claims = {"sub": f"user{user_id}", "exp": int(time.time() + expires_in)}
+    return jwt.encode(claims, "secret", algorithm="HS256")
+
+
+class FakeHistory:
+    """History client answering every record with `result`."""
+
+    def __init__(self, result=True):
+        self.result = result
+        self.batches = []
+
+    async def add_history_records(self, token, concept_details_list, idempotency_keys):
+        self.batches.append((token, concept_details_list, idempotency_keys))
+        if self.result is True:
+            return [{"id": i} for i, _ in enumerate(concept_details_list)]
+        return [self.result] * len(concept_details_list)
+
+    def delivered(self):
+        return [details for _, batch, _ in self.batches for details in batch]
+
+
+def queue(client, spill_path="", **overrides) -> HistoryWriteBehind:
+    config = HistoryQueueConfig()
+    config.max_size = 10
+    config.batch_size = 10
+    config.batch_wait = 0.01
+    config.max_attempts = 2
+    config.retry_delay = 0.01
+    config.spill_path = str(spill_path)
+    config.spill_retry_interval = 0.01
+    config.flush_timeout = 1.0
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return HistoryWriteBehind(client, config)
+
+
+def spilled(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_are_batched_per_token():
+    client = FakeHistory()
+    alice, bob = token(1), token(2)
+
+    async def run():
+        history = queue(client)
+        for n in range(3):
+            history.enqueue(alice, {"concept": f"a{n}"})
+        history.enqueue(bob, {"concept": "b0"})
+        history.start()
+        await asyncio.sleep(0.05)
+        await history.stop()
+        return history.stats()
+
+    stats = asyncio.run(run())
+    assert [(t, len(batch)) for t, batch, _ in client.batches] == [(alice, 3), (bob, 1)]
+    keys = [key for _, _, batch_keys in client.batches for key in batch_keys]
+    assert len(set(keys)) == 4
+    assert stats["delivered"] == 4
+
+
+def test_failed_records_are_retried_then_spilled(tmp_path):
+    client = FakeHistory(result=None)
+    path = tmp_path / "spill.jsonl"
+    alice = token(1)
+
+    async def run():
+        history = queue(client, path, spill_retry_interval=60)
+        history.enqueue(alice, {"concept": "Loop"})
+        history.start()
+        await asyncio.sleep(0.1)
+        await history.stop()
+        return history.stats()
+
+    stats = asyncio.run(run())
+    assert len(client.batches) == 2
+    assert stats["retried"] == 1
+    assert stats["spilled"] == 1
+    (record,) = spilled(path)
+    assert record["token"] == alice
+    assert record["concept_details"] == {"concept": "Loop"}
+    # The retry reuses the key, and so will the replay
+    assert record["idempotency_key"] == client.batches[0][2][0]
+    assert record["idempotency_key"] == client.batches[1][2][0]
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_rejected_records_are_dropped_not_retried(tmp_path):
+    client = FakeHistory(result=False)
+    path = tmp_path / "spill.jsonl"
+
+    async def run():
+        history = queue(client, path)
+        history.enqueue(token(1), {"concept": "Loop"})
+        history.start()
+        await asyncio.sleep(0.05)
+        await history.stop()
+        return history.stats()
+
+    stats = asyncio.run(run())
+    assert len(client.batches) == 1
+    assert stats["rejected"] == 1
+    assert not path.exists()
+
+
+def test_spilled_records_are_replayed_unless_their_token_expired(tmp_path):
+    client = FakeHistory()
+    path = tmp_path / "spill.jsonl"
+    live, expired = token(1), token(2, expires_in=-10)
+    with open(path, "w", encoding="utf-8") as f:
+        for t, concept in ((live, "kept"), (expired, "stale")):
+            record = {"token": t, "concept_details": {"concept": concept}}
+            f.write(json.dumps({**record, "idempotency_key": "k", "attempts": 0}))
+            f.write("\n")
+        # Written before records carried idempotency keys
+        legacy = {"token": live, "concept_details": {"concept": "old"}, "attempts": 0}
+        f.write(json.dumps(legacy) + "\n")
+
+    async def run():
+        history = queue(client, path, spill_retry_interval=60)
+        history.start()
+        await asyncio.sleep(0.05)
+        await history.stop()
+        return history.stats()
+
+    stats = asyncio.run(run())
+    assert client.delivered() == [{"concept": "kept"}, {"concept": "old"}]
+    assert client.batches[0][2][0] == "k"
+    assert client.batches[0][2][1]
+    assert stats["replayed"] == 2
+    assert stats["dropped"] == 1
+    assert not path.exists()
+
+
+def test_stop_flushes_queued_records():
+    client = FakeHistory()
+
+    async def run():
+        history = queue(client)
+        history.enqueue(token(1), {"concept": "Loop"})
+        history.enqueue(token(1), {"concept": "Recursion"})
+        await history.stop()
+        return history.stats()
+
+    stats = asyncio.run(run())
+    assert client.delivered() == [{"concept": "Loop"}, {"concept": "Recursion"}]
+    assert stats["delivered"] == 2
+
+
+def test_stop_spills_what_it_cannot_deliver(tmp_path):
+    path = tmp_path / "spill.jsonl"
+
+    class Hanging(FakeHistory):
+        async def add_history_records(self, **kwargs):
+            await asyncio.sleep(5)
+
+    async def run():
+        history = queue(Hanging(), path, flush_timeout=0.02)
+        history.enqueue(token(1), {"concept": "Loop"})
+        await history.stop()
+
+    asyncio.run(run())
+    assert [r["concept_details"] for r in spilled(path)] == [{"concept": "Loop"}]
+
+
+def test_full_queue_spills_and_reports_drops(tmp_path):
+    path = tmp_path / "spill.jsonl"
+
+    async def run():
+        with_spill = queue(FakeHistory(), path, max_size=1)
+        without_spill = queue(FakeHistory(), "", max_size=1)
+        results = [
+            with_spill.enqueue(token(1), {"concept": "a"}),
+            with_spill.enqueue(token(1), {"concept": "b"}),
+            without_spill.enqueue(token(1), {"concept": "a"}),
+            without_spill.enqueue(token(1), {"concept": "b"}),
+        ]
+        return results, with_spill.stats(), without_spill.stats()
+
+    results, with_spill, without_spill = asyncio.run(run())
+    assert results == [True, True, True, False]
+    assert with_spill["spilled"] == 1
+    assert without_spill["dropped"] == 1
+    assert [r["concept_details"] for r in spilled(path)] == [{"concept": "b"}]
@@ -0,0 +1,160 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from circuit_breaker import CircuitBreaker, CircuitBreakerConfig
+from rate_limiter import (
+    Priority,
+    RateLimiter,
+    RateLimiterConfig,
+    TokenBucket,
+    is_rate_limited,
+    retry_after_seconds,
+)
+
+
+def limiter(rpm: float = 5, reserve: float = 0.2, max_wait: float = 0.05):
+    config = RateLimiterConfig()
+    config.rpm = rpm
+    config.tpm = 1_000_000
+    config.tokens_per_request = 1
+    config.reserve_fraction = reserve
+    config.max_wait = max_wait
+    config.retry_base_delay = 1.0
+    return RateLimiter(config)
+
+
+def test_is_rate_limited():
+    assert is_rate_limited(SimpleNamespace(code=429))
+    assert is_rate_limited(SimpleNamespace(code=None, status="RESOURCE_EXHAUSTED"))
+    assert not is_rate_limited(SimpleNamespace(code=500, status="INTERNAL"))
+    assert not is_rate_limited(ValueError("boom"))
+
+
+def test_retry_after_from_header():
+    error = SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "7"}))
+    assert retry_after_seconds(error) == 7.0
+
+
+def test_retry_after_from_retry_info_detail():
+    error = SimpleNamespace(
+        details={"error": {"details": [{"retryDelay": "12s"}, {"other": 1}]}}
+    )
+    assert retry_after_seconds(error) == 12.0
+    assert retry_after_seconds(SimpleNamespace()) is None
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(rate_per_minute=60)
+    assert bucket.wait_time(1) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+    # A reserve has to be left behind as well
+    assert bucket.wait_time(1, reserve=2) == pytest.approx(3.0, abs=0.05)
+
+
+def test_lower_lanes_cannot_use_the_reserve():
+    async def run():
+        rate_limiter = limiter(rpm=5, reserve=0.2)
+        for _ in range(4):
+            await rate_limiter.acquire(Priority.ANONYMOUS)
+        with pytest.raises(HTTPException) as error:
+            await rate_limiter.acquire(Priority.BACKGROUND)
+        assert error.value.status_code == 429
+        # The reserved request is still there for authenticated traffic
+        await rate_limiter.acquire(Priority.AUTHENTICATED)
+        return rate_limiter.stats()
+
+    stats = asyncio.run(run())
+    assert stats["granted"] == {"authenticated": 1, "anonymous": 4, "background": 0}
+    assert stats["timeouts"] == 1
+
+
+def test_waiters_are_served_in_priority_order():
+    async def run():
+        # One request per 0.1 s, nothing reserved
+        rate_limiter = limiter(rpm=600, reserve=0, max_wait=5)
+        rate_limiter._requests.tokens = 0
+        order = []
+
+        async def call(priority, name):
+            await rate_limiter.acquire(priority)
+            order.append(name)
+
+        background = asyncio.ensure_future(call(Priority.BACKGROUND, "background"))
+        await asyncio.sleep(0)
+        anonymous = asyncio.ensure_future(call(Priority.ANONYMOUS, "anonymous"))
+        await asyncio.sleep(0)
+        authenticated = asyncio.ensure_future(
+            call(Priority.AUTHENTICATED, "authenticated")
+        )
+        await asyncio.gather(background, anonymous, authenticated)
+        return order
+
+    assert asyncio.run(run()) == ["authenticated", "anonymous", "background"]
+
+
+def test_throttle_pauses_every_lane():
+    async def run():
+        rate_limiter = limiter()
+        error = SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "5"}))
+        assert rate_limiter.throttle(error, attempt=0) == 5.0
+        with pytest.raises(HTTPException):
+            await rate_limiter.acquire(Priority.AUTHENTICATED)
+        return rate_limiter.stats()
+
+    stats = asyncio.run(run())
+    assert stats["throttled"] == 1
+    assert stats["blocked_for_seconds"] > 4
+
+
+def test_throttle_backs_off_exponentially_without_a_hint():
+    rate_limiter = limiter()
+    assert rate_limiter.throttle(SimpleNamespace(), attempt=2) == 4.0
+
+
+def test_record_usage_corrects_the_estimate():
+    rate_limiter = limiter()
+    before = rate_limiter._tokens.tokens
+    rate_limiter.record_usage(501)
+    assert rate_limiter._tokens.tokens == pytest.approx(before - 500, abs=1)
+
+
+class Quota(Exception):
+    code = 429
+
+
+def breaker(open_seconds: float = 30.0) -> CircuitBreaker:
+    config = CircuitBreakerConfig()
+    config.window = 10
+    config.min_calls = 4
+    config.error_rate = 0.5
+    config.open_seconds = open_seconds
+    return CircuitBreaker("test", config, ignore=is_rate_limited)
+
+
+def test_breaker_ignores_rate_limit_errors():
+    circuit = breaker()
+    for _ in range(8):
+        circuit.record_error(Quota())
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.stats()["ignored"] == 8
+    assert circuit.stats()["window_calls"] == 0
+
+    circuit.record_error(SimpleNamespace(status="RESOURCE_EXHAUSTED"))
+    for _ in range(4):
+        circuit.record_error(RuntimeError("down"))
+    assert circuit.state == CircuitBreaker.OPEN
+
+
+def test_ignored_error_releases_the_breaker_probe():
+    circuit = breaker(open_seconds=0.0)
+    for _ in range(4):
+        circuit.record_failure()
+    circuit.before_call()
+    circuit.record_error(Quota())
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    # The probe slot is free again
+    circuit.before_call()
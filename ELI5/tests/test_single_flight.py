@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from generation import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    async def run():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "explanation"
+
+        results = await asyncio.gather(
+            *(flight.do("Recursion", work) for _ in range(5))
+        )
+        return results, calls, flight.stats()
+
+    results, calls, stats = asyncio.run(run())
+    assert results == ["explanation"] * 5
+    assert len(calls) == 1
+    assert stats == {"in_flight": 0, "started": 1, "coalesced": 4}
+
+
+def test_different_keys_run_separately():
+    async def run():
+        flight = SingleFlight()
+
+        async def work(key):
+            await asyncio.sleep(0.01)
+            return key
+
+        return await asyncio.gather(
+            flight.do("a", lambda: work("a")), flight.do("b", lambda: work("b"))
+        )
+
+    assert asyncio.run(run()) == ["a", "b"]
+
+
+def test_finished_calls_are_not_reused():
+    async def run():
+        flight = SingleFlight()
+        count = 0
+
+        async def work():
+            nonlocal count
+            count += 1
+            return count
+
+        return [await flight.do("key", work), await flight.do("key", work)]
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_errors_reach_every_caller():
+    async def run():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("quota")
+
+        results = await asyncio.gather(
+            flight.do("key", work), flight.do("key", work), return_exceptions=True
+        )
+        return results, flight.stats()
+
+    results, stats = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert stats["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    async def run():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
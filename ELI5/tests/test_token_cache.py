@@ -0,0 +1,193 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from jose import jwt
+
+import token_cache
+from token_cache import TokenCacheConfig, TokenValidator
+
+SECRET = "test-secret"
+
+
+def token(user_id: int, expires_in: float = 600, secret: str = SECRET) -> str:
+    claims = {
+        "sub": f"user{user_id}@example.com",
+        "user_id": user_id,
+        "exp": int(time.time() + expires_in),
+    }
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+class FakeAuth:
+    """Auth service answering for the tokens it issued."""
+
+    def __init__(self, available: bool = True):
+        self.available = available
+        self.calls = []
+        self.users = {}
+
+    def issue(self, user_id: int, **kwargs) -> str:
+        issued = token(user_id, **kwargs)
+        self.users[issued] = {"id": user_id, "email": f"user{user_id}@example.com"}
+        return issued
+
+    async def fetch_current_user(self, token: str):
+        self.calls.append(token)
+        if not self.available:
+            raise ConnectionError("auth service down")
+        return self.users.get(token)
+
+
+def validator(auth: FakeAuth, secret=SECRET, max_entries: int = 100):
+    config = TokenCacheConfig()
+    config.secret_key = secret
+    config.algorithm = "HS256"
+    config.max_entries = max_entries
+    config.negative_ttl = 60
+    config.default_ttl = 300
+    return TokenValidator(auth, config)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls the time the cache sees; starts at the real time."""
+    now = [time.time()]
+    monkeypatch.setattr(token_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_valid_token_is_cached_after_one_auth_call():
+    auth = FakeAuth()
+    good = auth.issue(1)
+    tokens = validator(auth)
+
+    async def run():
+        return [await tokens.validate(good) for _ in range(3)]
+
+    users = asyncio.run(run())
+    assert users == [{"id": 1, "email": "user1@example.com"}] * 3
+    assert auth.calls == [good]
+    assert tokens.stats()["hits"] == 2
+
+
+def test_cache_is_keyed_by_token():
+    auth = FakeAuth()
+    first, second = auth.issue(1), auth.issue(2)
+    tokens = validator(auth)
+
+    async def run():
+        return [await tokens.validate(t) for t in (first, second, first, second)]
+
+    assert [user["id"] for user in asyncio.run(run())] == [1, 2, 1, 2]
+    assert auth.calls == [first, second]
+
+
+def test_callers_cannot_change_the_cached_user():
+    auth = FakeAuth()
+    good = auth.issue(1)
+    tokens = validator(auth)
+
+    async def run():
+        user = await tokens.validate(good)
+        user["token"] = good
+        return await tokens.validate(good)
+
+    assert "token" not in asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "bad",
+    [
+        token(1, expires_in=-10),
+        token(1, secret="other-secret"),
+        "not-a-jwt",
+    ],
+)
+def test_bad_tokens_are_rejected_without_asking_the_auth_service(bad):
+    auth = FakeAuth()
+    tokens = validator(auth)
+    assert asyncio.run(tokens.validate(bad)) is None
+    assert not tokens.verified_locally(bad)
+    assert auth.calls == []
+    assert tokens.stats()["local_rejections"] == 1
+
+
+def test_cached_token_is_not_served_past_its_expiry(clock):
+    auth = FakeAuth()
+    good = auth.issue(1, expires_in=60)
+    tokens = validator(auth)
+
+    async def run():
+        first = await tokens.validate(good)
+        clock[0] += 61
+        # The auth service no longer accepts the token
+        auth.users.clear()
+        return first, await tokens.validate(good)
+
+    first, later = asyncio.run(run())
+    assert first["id"] == 1
+    assert later is None
+    assert auth.calls == [good, good]
+
+
+def test_remotely_validated_token_is_not_cached_past_its_expiry(clock):
+    auth = FakeAuth()
+    # Expires before the default cache lifetime
+    good = auth.issue(1, expires_in=60)
+    tokens = validator(auth, secret=None)
+
+    async def run():
+        first = await tokens.validate(good)
+        clock[0] += 61
+        auth.users.clear()
+        return first, await tokens.validate(good)
+
+    first, later = asyncio.run(run())
+    assert first["id"] == 1
+    assert later is None
+    assert len(auth.calls) == 2
+
+
+def test_rejected_tokens_are_negatively_cached():
+    auth = FakeAuth()
+    # Signed correctly, but unknown to the auth service
+    unknown = token(7)
+    tokens = validator(auth)
+
+    async def run():
+        return [await tokens.validate(unknown) for _ in range(3)]
+
+    assert asyncio.run(run()) == [None] * 3
+    assert auth.calls == [unknown]
+    assert tokens.stats()["negative_hits"] == 2
+    assert not tokens.verified_locally(unknown)
+
+
+def test_signed_claims_are_served_while_the_auth_service_is_down():
+    auth = FakeAuth(available=False)
+    good = token(3)
+    tokens = validator(auth)
+
+    async def run():
+        return [await tokens.validate(good) for _ in range(2)]
+
+    assert asyncio.run(run()) == [{"id": 3, "email": "user3@example.com"}] * 2
+    # Nothing was cached, so the auth service is asked again
+    assert len(auth.calls) == 2
+
+
+def test_least_recently_used_tokens_are_evicted():
+    auth = FakeAuth()
+    issued = [auth.issue(user_id) for user_id in range(3)]
+    tokens = validator(auth, max_entries=2)
+
+    async def run():
+        for t in issued:
+            await tokens.validate(t)
+        await tokens.validate(issued[0])
+
+    asyncio.run(run())
+    assert auth.calls == issued + [issued[0]]
+    assert tokens.stats()["entries"] == 2
@@ -0,0 +1,165 @@
+"""
+Local JWT verification and caching of validated tokens.
+"""
+
+import os
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from jose import JWTError, jwt
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCacheConfig:
+    """Configuration for token verification in the ELI5 service."""
+
+    def __init__(self):
+        # Must match the auth service's SECRET_KEY; without it tokens are
+        # only validated by the auth service (results are still cached)
+        self.secret_key = os.getenv("SECRET_KEY") or None
+        self.algorithm = os.getenv("ALGORITHM", "HS256")
+        # Maximum number of tokens kept in the LRU cache
+        self.max_entries = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "1000"))
+        # How long rejected tokens are remembered (seconds)
+        self.negative_ttl = float(os.getenv("TOKEN_NEGATIVE_TTL", "60.0"))
+        # Cache lifetime for tokens whose expiry cannot be read (seconds)
+        self.default_ttl = float(os.getenv("TOKEN_CACHE_DEFAULT_TTL", "300.0"))
+
+
+def unverified_expiry(token: str) -> Optional[float]:
+    """The token's `exp`, read without checking its signature."""
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return None
+    return float(exp) if exp else None
+
+
+class TokenValidator:
+    """
+    Validates bearer tokens with as few auth service round trips as possible.
+    Tokens are verified locally when SECRET_KEY is configured, and user data
+    for valid tokens is kept in an LRU cache until the token's `exp`. Bad
+    tokens are negatively cached for `negative_ttl` seconds. The auth service
+    is only called the first time a valid token is seen.
+    """
+
+    def __init__(self, auth_client: Any, config: TokenCacheConfig):
+        self.auth_client = auth_client
+        self.config = config
+        # token -> (expires_at, user data or None for a rejected token)
+        self._cache: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = (
+            OrderedDict()
+        )
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._remote_calls = 0
+        self._local_rejections = 0
+
+    def _store(self, token: str, expires_at: float, user: Optional[Dict[str, Any]]):
+        self._cache[token] = (expires_at, user)
+        self._cache.move_to_end(token)
+        while len(self._cache) > self.config.max_entries:
+            self._cache.popitem(last=False)
+
+    def _lookup(self, token: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        entry = self._cache.get(token)
+        if entry is None:
+            return False, None
+        expires_at, user = entry
+        if expires_at <= time.time():
+            del self._cache[token]
+            return False, None
+        self._cache.move_to_end(token)
+        return True, user
+
+    def _decode(self, token: str) -> Optional[Dict[str, Any]]:
+        try:
+            claims = jwt.decode(
+                token, self.config.secret_key, algorithms=[self.config.algorithm]
+            )
+        except JWTError as e:
+            logger.warning(f"Token rejected locally: {str(e)}")
+            return None
+        if claims.get("sub") is None or claims.get("user_id") is None:
+            return None
+        return claims
+
+    def verified_locally(self, token: str) -> bool:
+        """
+        Whether the token is already known to be good without asking the
+        auth service: a cached valid token, or one whose signature checks
+        out against SECRET_KEY. False means "unknown", not "invalid".
+        """
+        found, user = self._lookup(token)
+        if found:
+            return user is not None
+        if not self.config.secret_key:
+            return False
+        return self._decode(token) is not None
+
+    async def validate(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return user data for a valid token, or None if it is invalid."""
+        found, user = self._lookup(token)
+        if found:
+            if user is None:
+                self._negative_hits += 1
+                return None
+            self._hits += 1
+            return dict(user)
+
+        self._misses += 1
+        now = time.time()
+        claims = None
+        if self.config.secret_key:
+            claims = self._decode(token)
+            if claims is None:
+                self._local_rejections += 1
+                self._store(token, now + self.config.negative_ttl, None)
+                return None
+
+        self._remote_calls += 1
+        try:
+            user = await self.auth_client.fetch_current_user(token)
+        except Exception as e:
+            if claims is None:
+                logger.error(f"Error validating token: {str(e)}")
+                return None
+            # The signature already checked out; serve the claims uncached
+            logger.warning(f"Auth service unavailable, using token claims: {str(e)}")
+            return {"id": claims["user_id"], "email": claims["sub"]}
+
+        if user is None:
+            self._store(token, now + self.config.negative_ttl, None)
+            return None
+
+        expires_at = now + self.config.default_ttl
+        if claims is not None and claims.get("exp"):
+            expires_at = float(claims["exp"])
+        elif claims is None:
+            # Checked by the auth service, but the cached user must still
+            # not outlive the token
+            exp = unverified_expiry(token)
+            if exp is not None:
+                expires_at = min(expires_at, exp)
+        self._store(token, expires_at, user)
+        return dict(user)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit counters."""
+        lookups = self._hits + self._negative_hits + self._misses
+        return {
+            "local_verification": self.config.secret_key is not None,
+            "entries": len(self._cache),
+            "hits": self._hits,
+            "negative_hits": self._negative_hits,
+            "misses": self._misses,
+            "hit_rate": (
+                (self._hits + self._negative_hits) / lookups if lookups else 0.0
+            ),
+            "local_rejections": self._local_rejections,
+            "auth_service_calls": self._remote_calls,
+        }
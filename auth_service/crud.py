@@ -1,7 +1,6 @@
 from sqlalchemy.orm import Session
 import models
 import schemas
-from auth_utils import get_password_hash
 
 
 def get_user_by_email(db: Session, email: str):
@@ -12,8 +11,7 @@ def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     db_user = models.User(
         email=user.email, username=user.username, hashed_password=hashed_password
     )
@@ -3,12 +3,14 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+from storage_profile import StorageProfileConfig, apply_sqlite_pragmas, engine_options
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./auth.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Needed for SQLite
-)
+storage_profile = StorageProfileConfig()
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, storage_profile))
+apply_sqlite_pragmas(engine, storage_profile)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -1,7 +1,9 @@
+import asyncio
 from fastapi import FastAPI, Depends, HTTPException, status, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
 from datetime import timedelta
 from typing import Optional
 
@@ -11,13 +13,34 @@ import crud
 import schemas
 import auth_utils
 from database import SessionLocal, create_db_and_tables
+from password_pool import PasswordPool, PasswordPoolConfig
+from deadlines import DeadlineMiddleware
+from wire_format import NegotiatedRoute
 
 # Create database tables if they don't exist
 # In a production Render environment, you might run migrations separately
 # or ensure your Dockerfile/build script handles this.
 create_db_and_tables()
 
-app = FastAPI(title="Auth Service")
+# bcrypt runs in worker processes so it cannot starve token checks
+password_pool = PasswordPool(PasswordPoolConfig())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    password_pool.start()
+    yield
+    # Shutdown
+    password_pool.stop()
+
+
+app = FastAPI(title="Auth Service", lifespan=lifespan)
+# Answer service clients in msgpack and browsers in JSON
+app.router.route_class = NegotiatedRoute
+
+# Abandon work whose caller has stopped waiting for it
+app.add_middleware(DeadlineMiddleware)
 
 # Configure CORS to allow local frontend communication
 app.add_middleware(
@@ -41,49 +64,74 @@ def get_db():
         db.close()
 
 
+# The handlers below await bcrypt in the password pool, so they are async and
+# do their blocking database work in worker threads, each step in its own
+# short-lived session. No connection is held while a password is hashed.
+
+
+def _registration_conflict(user: schemas.UserCreate) -> Optional[str]:
+    """Why `user` cannot be registered, or None if it can."""
+    with SessionLocal() as db:
+        if crud.get_user_by_email(db, email=user.email):
+            return "Email already registered"
+        if crud.get_user_by_username(db, username=user.username):
+            return "Username already taken"
+    return None
+
+
+def _create_user(user: schemas.UserCreate, hashed_password: str) -> schemas.User:
+    with SessionLocal() as db:
+        created_user = crud.create_user(
+            db=db, user=user, hashed_password=hashed_password
+        )
+        # Use model_validate for robust mapping from the SQLAlchemy model to the Pydantic schema.
+        # This requires schemas.User to have model_config = {"from_attributes": True} (Pydantic V2).
+        return schemas.User.model_validate(created_user)
+
+
+def _user_by_email(email: str):
+    with SessionLocal() as db:
+        return crud.get_user_by_email(db, email=email)
+
+
+async def _authenticate(email: str, password: str):
+    """The user with these credentials; raises 401 otherwise."""
+    user = await asyncio.to_thread(_user_by_email, email)
+    if not user or not await password_pool.verify(password, str(user.hashed_password)):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
 @app.post("/auth/signup", response_model=schemas.User)
-def signup_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def signup_user(user: schemas.UserCreate):
     """
     Register a new user.
     - **username**: Username for the new user.
     - **email**: Email for the new user.
     - **password**: Password for the new user.
     """
-    db_user_by_email = crud.get_user_by_email(db, email=user.email)
-    if db_user_by_email:
-        raise HTTPException(status_code=400, detail="Email already registered")
+    conflict = await asyncio.to_thread(_registration_conflict, user)
+    if conflict:
+        raise HTTPException(status_code=400, detail=conflict)
 
-    db_user_by_username = crud.get_user_by_username(db, username=user.username)
-    if db_user_by_username:
-        raise HTTPException(status_code=400, detail="Username already taken")
-
-    created_user = crud.create_user(db=db, user=user)
+    hashed_password = await password_pool.hash(user.password)
     # Exclude password from the response, even though User schema doesn't have it.
     # This is more for clarity if User schema were to change.
-    # Use model_validate for robust mapping from the SQLAlchemy model to the Pydantic schema.
-    # This requires schemas.User to have model_config = {"from_attributes": True} (Pydantic V2).
-    return schemas.User.model_validate(created_user)
+    return await asyncio.to_thread(_create_user, user, hashed_password)
 
 
 @app.post("/auth/login", response_model=schemas.Token)
-def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
-):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Log in a user and return a JWT access token.
     Uses OAuth2PasswordRequestForm, so expects 'username' (which we treat as email here for login) and 'password' in form data.
     """
-    user = crud.get_user_by_email(
-        db, email=form_data.username
-    )  # form_data.username is used for email
-    if not user or not auth_utils.verify_password(
-        form_data.password, str(user.hashed_password)
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    # form_data.username is used for email
+    user = await _authenticate(form_data.username, form_data.password)
     access_token_expires = timedelta(minutes=auth_utils.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth_utils.create_access_token(
         data={"sub": user.email, "user_id": user.id}, expires_delta=access_token_expires
@@ -92,20 +140,12 @@ def login_for_access_token(
 
 
 @app.post("/api/auth/login", response_model=schemas.Token)
-def login_with_json(user_login: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login_with_json(user_login: schemas.UserLogin):
     """
     Log in a user with JSON payload and return a JWT access token.
     Accepts JSON with 'email' and 'password' fields.
     """
-    user = crud.get_user_by_email(db, email=user_login.email)
-    if not user or not auth_utils.verify_password(
-        user_login.password, str(user.hashed_password)
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    user = await _authenticate(user_login.email, user_login.password)
     access_token_expires = timedelta(minutes=auth_utils.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth_utils.create_access_token(
         data={"sub": user.email, "user_id": user.id}, expires_delta=access_token_expires
@@ -147,6 +187,14 @@ async def read_users_me(current_user=Depends(get_current_user)):
     return schemas.User.model_validate(current_user)
 
 
+@app.get("/auth/metrics")
+async def get_metrics():
+    """
+    Report internal usage counters for the Auth service.
+    """
+    return {"password_pool": password_pool.stats()}
+
+
 # Health check endpoint
 @app.get("/auth/health")
 def health_check():
@@ -0,0 +1,107 @@
+"""
+Bounded process pool for bcrypt hashing and verification.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+import auth_utils
+import deadlines
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolConfig:
+    """Configuration for the password hashing pool."""
+
+    def __init__(self):
+        # Worker processes running bcrypt (0 runs it on a single thread instead)
+        self.workers = int(
+            os.getenv("PASSWORD_POOL_WORKERS", str(min(os.cpu_count() or 1, 4)))
+        )
+        # Hash/verify calls allowed in the pool or waiting for it before
+        # new ones are rejected with 503
+        self.max_pending = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "64"))
+
+
+class PasswordPool:
+    """
+    Runs bcrypt in a pool of worker processes so credential checks use
+    every core and never hold the event loop or a request thread. At most
+    `max_pending` calls are admitted at a time; beyond that requests are
+    rejected straight away instead of queueing behind a login burst.
+    """
+
+    def __init__(self, config: PasswordPoolConfig):
+        self.config = config
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def start(self):
+        """Start the worker processes."""
+        if self._executor is not None:
+            return
+        if self.config.workers > 0:
+            # Spawn rather than fork: the server already runs threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.config.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        logger.info(f"Password pool started with {self.config.workers} workers")
+
+    def stop(self):
+        """Shut down the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn: Callable[..., Any], *args) -> Any:
+        # Don't spend a bcrypt round on a request nobody is waiting for
+        deadlines.check_deadline()
+        if self._pending >= self.config.max_pending:
+            self._rejected += 1
+            logger.warning("Password pool is saturated, rejecting request")
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-ins in progress, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.start()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, fn, *args
+            )
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    async def hash(self, password: str) -> str:
+        """bcrypt hash of a password."""
+        return await self._run(auth_utils.get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Check a password against its bcrypt hash."""
+        return await self._run(
+            auth_utils.verify_password, plain_password, hashed_password
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size and admission counters."""
+        return {
+            "workers": self.config.workers,
+            "pending": self._pending,
+            "max_pending": self.config.max_pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
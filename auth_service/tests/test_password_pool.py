@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import auth_utils
+import deadlines
+from password_pool import PasswordPool, PasswordPoolConfig
+
+
+def pool(workers: int = 0, max_pending: int = 8) -> PasswordPool:
+    config = PasswordPoolConfig()
+    config.workers = workers
+    config.max_pending = max_pending
+    return PasswordPool(config)
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_hash_and_verify_round_trip(workers):
+    passwords = pool(workers=workers)
+
+    async def run():
+        hashed = await passwords.hash("correct horse")
+        return (
+            hashed,
+            await passwords.verify("correct horse", hashed),
+            await passwords.verify("wrong horse", hashed),
+        )
+
+    try:
+        hashed, good, bad = asyncio.run(run())
+    finally:
+        passwords.stop()
+    assert hashed.startswith("$2")
+    assert good is True
+    assert bad is False
+    assert passwords.stats()["completed"] == 3
+
+
+def test_saturated_pool_rejects_with_503(monkeypatch):
+    def slow_hash(password):
+        time.sleep(0.1)
+        return "hashed"
+
+    monkeypatch.setattr(auth_utils, "get_password_hash", slow_hash)
+    passwords = pool(max_pending=1)
+
+    async def run():
+        return await asyncio.gather(
+            passwords.hash("a"), passwords.hash("b"), return_exceptions=True
+        )
+
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        passwords.stop()
+    assert first == "hashed"
+    assert isinstance(second, HTTPException)
+    assert second.status_code == 503
+    assert second.headers == {"Retry-After": "1"}
+    assert passwords.stats()["rejected"] == 1
+    assert passwords.stats()["pending"] == 0
+
+
+def test_expired_deadline_skips_the_hash(monkeypatch):
+    calls = []
+    monkeypatch.setattr(auth_utils, "get_password_hash", calls.append)
+    passwords = pool()
+
+    async def run():
+        deadlines.set_deadline(0)
+        await passwords.hash("a")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+    passwords.stop()
+    assert error.value.status_code == 504
+    assert calls == []
@@ -0,0 +1,127 @@
+"""
+Benchmark the history storage codecs: database size, write time and the
+latency of reading a page of history.
+
+Usage:
+    python benchmarks/history_storage_codec.py [--records 2000] [--dedup]
+
+Each codec (none, zlib and, if installed, zstd) gets a fresh SQLite file
+filled with explanation-sized markdown built from ELI5's bundled
+explanations. Content deduplication is off by default so the payloads land
+in the history data column itself.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "history_service"))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+import content_store  # noqa: E402
+import crud  # noqa: E402
+import storage_codec  # noqa: E402
+from database import Base  # noqa: E402
+
+USERS = 50
+PAGE_SIZE = 20
+
+
+def build_payloads(count: int):
+    """concept_details shaped like the ones ELI5 sends, ~4 KB of markdown each."""
+    with open(os.path.join(ROOT, "ELI5", "fallback_explanations.json")) as f:
+        explanations = json.load(f)
+    concepts = list(explanations)
+    rng = random.Random(0)
+    payloads = []
+    for _ in range(count):
+        concept = rng.choice(concepts)
+        sections = rng.sample(concepts, 8)
+        markdown = "\n\n".join(
+            f"## {name}\n\n{explanations[name]}" for name in sections
+        )
+        payloads.append(
+            {
+                "concept": concept,
+                "explanation": markdown,
+                "model_used": "gemini-pro",
+                "prompt": f"Explain {concept} like I'm five. " * 10,
+            }
+        )
+    return payloads
+
+
+async def run(codec: str, payloads, dedup: bool):
+    storage_codec.config.codec = codec
+    content_store.config.enabled = dedup
+    path = os.path.join(tempfile.mkdtemp(), f"history_{codec}.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    start = time.perf_counter()
+    async with Session() as db:
+        for offset in range(0, len(payloads), 100):
+            rows = [
+                (i % USERS + 1, data, None)
+                for i, data in enumerate(payloads[offset : offset + 100], offset)
+            ]
+            await crud.create_history_records(db, rows)
+    write_seconds = time.perf_counter() - start
+
+    latencies = []
+    async with Session() as db:
+        for i in range(500):
+            start = time.perf_counter()
+            await crud.get_history_records_by_user(
+                db, user_id=i % USERS + 1, limit=PAGE_SIZE
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+    await engine.dispose()
+
+    latencies.sort()
+    return {
+        "codec": codec,
+        "db_kb": os.path.getsize(path) / 1024,
+        "write_s": write_seconds,
+        "read_p50_ms": statistics.median(latencies),
+        "read_p95_ms": latencies[int(len(latencies) * 0.95)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--dedup", action="store_true")
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.records)
+    codecs = ["none", "zlib"] + (["zstd"] if storage_codec.zstandard else [])
+    print(
+        f"{args.records} records, {USERS} users, page size {PAGE_SIZE}, "
+        f"dedup {'on' if args.dedup else 'off'}"
+    )
+    print(
+        f"{'codec':<6} {'db KB':>10} {'write s':>9} {'read p50 ms':>12} {'read p95 ms':>12}"
+    )
+    for codec in codecs:
+        r = asyncio.run(run(codec, payloads, args.dedup))
+        print(
+            f"{r['codec']:<6} {r['db_kb']:>10.0f} {r['write_s']:>9.2f} "
+            f"{r['read_p50_ms']:>12.2f} {r['read_p95_ms']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
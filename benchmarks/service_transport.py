@@ -0,0 +1,152 @@
+"""
+Benchmark service client calls over TCP against a Unix domain socket.
+
+Usage:
+    python benchmarks/service_transport.py [--requests 2000]
+        [--concurrency 1,20] [--payload-bytes 4096]
+
+Starts a small FastAPI app in a subprocess, listening on both a loopback
+TCP port and a Unix socket through the same entry point the services use,
+then drives it with BaseServiceClient. The app negotiates responses like
+the services do (NegotiatedRoute). Each run makes GET requests shaped like
+a token check and POSTs carrying a history-sized JSON body, and reports
+throughput and latency percentiles per transport.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+
+from fastapi import FastAPI  # noqa: E402
+
+from service_http import BaseServiceClient  # noqa: E402
+from service_server import ServiceServerConfig, serve  # noqa: E402
+from wire_format import NegotiatedRoute  # noqa: E402
+
+PORT = 8765
+
+app = FastAPI()
+app.router.route_class = NegotiatedRoute
+
+
+@app.get("/auth/me")
+async def me():
+    return {"id": 1, "username": "bench", "email": "bench@example.com"}
+
+
+@app.post("/history/")
+async def add_history(record: dict):
+    return {"id": 1, "user_id": 1, "data": record}
+
+
+async def run(client: BaseServiceClient, count: int, concurrency: int, call):
+    """Run `count` calls with bounded concurrency; (requests/s, latencies)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await call()
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+
+    # Warm up the connection pool
+    await asyncio.gather(*(call() for _ in range(concurrency)))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    return count / (time.perf_counter() - start), sorted(latencies)
+
+
+def percentile(latencies, pct: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))]
+
+
+async def bench(args, uds_path: str):
+    clients = {
+        "tcp": BaseServiceClient(f"http://127.0.0.1:{PORT}"),
+        "uds": BaseServiceClient(f"unix://{uds_path}"),
+    }
+    body = {"concept_details": {"concept": "Recursion", "x": "a" * args.payload_bytes}}
+    print(
+        f"{'call':<8}{'conc':>6}{'transport':>11}{'req/s':>10}"
+        f"{'p50 ms':>9}{'p99 ms':>9}{'mean ms':>9}"
+    )
+    for name in ("get", "post"):
+        for concurrency in args.concurrency:
+            for transport, client in clients.items():
+                if name == "get":
+                    call = lambda: client._make_request("GET", "/auth/me")  # noqa: E731
+                else:
+                    call = lambda: client._make_request(  # noqa: E731
+                        "POST", "/history/", json_data=body
+                    )
+                rate, latencies = await run(client, args.requests, concurrency, call)
+                print(
+                    f"{name:<8}{concurrency:>6}{transport:>11}{rate:>10.0f}"
+                    f"{percentile(latencies, 50) * 1000:>9.2f}"
+                    f"{percentile(latencies, 99) * 1000:>9.2f}"
+                    f"{statistics.mean(latencies) * 1000:>9.2f}"
+                )
+    for client in clients.values():
+        await client.close()
+
+
+async def wait_until_up(timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(f"http://127.0.0.1:{PORT}/auth/me")
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("benchmark server did not start")
+                await asyncio.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(part) for part in value.split(",")],
+        default=[1, 20],
+    )
+    parser.add_argument("--payload-bytes", type=int, default=4096)
+    parser.add_argument("--serve", metavar="UDS_PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        config = ServiceServerConfig()
+        config.host, config.port, config.uds_path = "127.0.0.1", PORT, args.serve
+        serve(app, config)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uds_path = os.path.join(tmp, "bench.sock")
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", uds_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            asyncio.run(wait_until_up())
+            asyncio.run(bench(args, uds_path))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
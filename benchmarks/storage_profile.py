@@ -0,0 +1,107 @@
+"""
+Benchmark history write and read throughput under each storage profile.
+
+Usage:
+    python benchmarks/storage_profile.py [--writes 1000] [--reads 2000]
+        [--concurrency 20] [--database-url sqlite+aiosqlite:///path.db]
+
+Without --database-url each profile gets a fresh SQLite file. Writes are
+single-record transactions (the worst case the group-commit writer exists
+to avoid), and reads fetch a page of history per request.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "history_service"))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+import crud  # noqa: E402
+from database import Base  # noqa: E402
+from storage_profile import PROFILES, StorageProfileConfig  # noqa: E402
+from storage_profile import apply_sqlite_pragmas, engine_options  # noqa: E402
+
+USERS = 50
+PAGE_SIZE = 20
+
+
+async def run_concurrently(count: int, concurrency: int, fn) -> float:
+    """Run fn(i) for i in range(count) with bounded concurrency; ops/second."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await fn(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return count / (time.perf_counter() - start)
+
+
+async def run(profile: str, url: str, args):
+    config = StorageProfileConfig()
+    config.profile = profile
+    engine = create_async_engine(url, **engine_options(url, config))
+    apply_sqlite_pragmas(engine.sync_engine, config)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def write(i):
+        async with Session() as db:
+            await crud.create_history_records(
+                db,
+                [
+                    (
+                        i % USERS + 1,
+                        {
+                            "concept": f"Concept {i % 30}",
+                            "explanation": f"Explanation {i} " * 40,
+                            "model_used": "gemini-pro",
+                        },
+                        None,
+                    )
+                ],
+            )
+
+    async def read(i):
+        async with Session() as db:
+            await crud.get_history_records_by_user(
+                db, user_id=i % USERS + 1, limit=PAGE_SIZE
+            )
+
+    writes = await run_concurrently(args.writes, args.concurrency, write)
+    reads = await run_concurrently(args.reads, args.concurrency, read)
+    await engine.dispose()
+    return writes, reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writes", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    print(f"{args.writes} writes, {args.reads} reads, concurrency {args.concurrency}")
+    print(f"{'profile':<11} {'writes/s':>10} {'reads/s':>10}")
+    for profile in PROFILES:
+        url = args.database_url or (
+            f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'history.db')}"
+        )
+        writes, reads = asyncio.run(run(profile, url, args))
+        print(f"{profile:<11} {writes:>10.0f} {reads:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark JSON against msgpack for the bodies exchanged between services.
+
+Usage:
+    python benchmarks/wire_format.py [--iterations 2000]
+
+For each payload shape (a /auth/me user, one history record with a
+markdown explanation, and pages of full and summary history records) it
+reports the encoded size and the CPU time to encode and decode the body,
+using the same encoders the services use on each side of a call.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+
+import msgpack  # noqa: E402
+
+EXPLANATION = (
+    "Imagine you want to build a really tall tower with your blocks. You "
+    "can't just throw blocks randomly, right? You need a **plan**!\n\n"
+    "That's kind of what an **algorithm** is! It's like a *set of "
+    "instructions*, like a recipe, to do something.\n\n"
+    "* Step one: find a flat spot.\n* Step two: put the big blocks first.\n"
+) * 8
+
+
+def history_record(record_id: int) -> dict:
+    return {
+        "id": record_id,
+        "user_id": 42,
+        "timestamp": "2025-06-01T12:00:00",
+        "data": {
+            "concept": "Algorithms",
+            "explanation": EXPLANATION,
+            "model_used": "gemini-2.0-flash-thinking-exp-01-21",
+            "concept_type": "predefined",
+        },
+    }
+
+
+def summary(record_id: int) -> dict:
+    return {
+        "id": record_id,
+        "timestamp": "2025-06-01T12:00:00",
+        "concept": "Algorithms",
+        "model_used": "gemini-2.0-flash-thinking-exp-01-21",
+    }
+
+
+PAYLOADS = {
+    "user": {"id": 42, "username": "learner", "email": "learner@example.com"},
+    "record": history_record(1),
+    "page x100": [history_record(i) for i in range(100)],
+    "summaries x100": [summary(i) for i in range(100)],
+}
+
+
+def json_encode(data) -> bytes:
+    """The encoding JSONResponse.render uses."""
+    return json.dumps(
+        data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+# Server-side encoders match JSONResponse.render and MsgpackResponse.render;
+# clients decode with json.loads (httpx) or msgpack.unpackb
+FORMATS = {
+    "json": (json_encode, json.loads),
+    "msgpack": (msgpack.packb, msgpack.unpackb),
+}
+
+
+def timed(fn, arg, iterations: int) -> float:
+    """Mean microseconds per call."""
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(arg)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(
+        f"{'payload':<16}{'format':>9}{'bytes':>9}{'saved':>8}"
+        f"{'encode us':>11}{'decode us':>11}"
+    )
+    for name, payload in PAYLOADS.items():
+        iterations = max(args.iterations // (50 if "x100" in name else 1), 20)
+        json_size = None
+        for fmt, (encode, decode) in FORMATS.items():
+            body = encode(payload)
+            assert decode(body) == payload
+            json_size = json_size or len(body)
+            print(
+                f"{name:<16}{fmt:>9}{len(body):>9}"
+                f"{1 - len(body) / json_size:>8.1%}"
+                f"{timed(encode, payload, iterations):>11.1f}"
+                f"{timed(decode, body, iterations):>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
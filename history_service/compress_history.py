@@ -0,0 +1,84 @@
+"""
+Rewrite stored history payloads with the configured storage codec.
+
+Usage:
+    HISTORY_STORAGE_CODEC=zlib python compress_history.py [--batch-size 500]
+
+Rows already stored the way the current configuration would store them are
+skipped, so the command can be re-run safely or resumed after a stop. Run it
+with HISTORY_STORAGE_CODEC=none to decompress everything again.
+"""
+
+import argparse
+import logging
+
+from sqlalchemy import JSON, Text, select, type_coerce, update
+
+import models
+import storage_codec
+from database import SessionLocal, create_db_and_tables
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate_column(db, model, key_column, data_column, raw_type, batch_size: int):
+    """Re-encode one column in primary-key order, committing every batch."""
+    codec_type = data_column.type
+    last_key = None
+    scanned = rewritten = 0
+    while True:
+        query = select(key_column, type_coerce(data_column, raw_type))
+        if last_key is not None:
+            query = query.where(key_column > last_key)
+        rows = db.execute(query.order_by(key_column).limit(batch_size)).all()
+        if not rows:
+            break
+
+        changes = []
+        for key, stored in rows:
+            value = codec_type.process_result_value(stored, None)
+            if codec_type.process_bind_param(value, None) != stored:
+                changes.append({key_column.key: key, data_column.key: value})
+        if changes:
+            db.execute(update(model), changes)
+        db.commit()
+
+        scanned += len(rows)
+        rewritten += len(changes)
+        last_key = rows[-1][0]
+        logger.info(f"{model.__tablename__}: scanned {scanned}, rewritten {rewritten}")
+    return scanned, rewritten
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    logger.info(f"Rewriting history payloads with codec '{storage_codec.config.codec}'")
+    db = SessionLocal()
+    try:
+        migrate_column(
+            db,
+            models.HistoryRecord,
+            models.HistoryRecord.id,
+            models.HistoryRecord.data,
+            JSON,
+            args.batch_size,
+        )
+        migrate_column(
+            db,
+            models.ContentBlob,
+            models.ContentBlob.hash,
+            models.ContentBlob.body,
+            Text,
+            args.batch_size,
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Content-addressed storage for large history bodies.
+"""
+
+import hashlib
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import insert as generic_insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+
+# Key under which rows written before the content_refs column listed the
+# fields moved to the blob table, inside the record's own data
+LEGACY_REFS_KEY = "_content_refs"
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ContentStoreConfig:
+    """Configuration for history body deduplication."""
+
+    def __init__(self):
+        self.enabled = os.getenv("HISTORY_CONTENT_DEDUP", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        # String fields at least this long (bytes) are stored once by hash
+        self.min_bytes = int(os.getenv("HISTORY_DEDUP_MIN_BYTES", "256"))
+
+
+config = ContentStoreConfig()
+
+
+def hash_body(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+async def _insert_missing(db: AsyncSession, blobs: Dict[str, str]):
+    """Insert the blobs not already stored, tolerating concurrent writers."""
+    result = await db.execute(
+        select(models.ContentBlob.hash).where(models.ContentBlob.hash.in_(list(blobs)))
+    )
+    existing = set(result.scalars().all())
+    rows = [
+        {"hash": digest, "body": body}
+        for digest, body in blobs.items()
+        if digest not in existing
+    ]
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        await db.execute(generic_insert(models.ContentBlob), rows)
+        return
+    await db.execute(
+        insert(models.ContentBlob)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["hash"])
+    )
+
+
+async def pack(
+    db: AsyncSession, data_list: List[Any]
+) -> List[Tuple[Any, Dict[str, str]]]:
+    """
+    Move large string fields of each record's data into the blob table.
+    Returns (data, refs) per record: the data without the moved fields and
+    the hashes of the moved fields by key, which are stored next to the
+    data rather than inside it. Bodies already stored are not written
+    again. Data that is not a JSON object is stored as is.
+    """
+    if not config.enabled:
+        return [(data, {}) for data in data_list]
+
+    blobs: Dict[str, str] = {}
+    packed = []
+    for data in data_list:
+        if not isinstance(data, dict):
+            packed.append((data, {}))
+            continue
+        refs = {}
+        stored = {}
+        for key, value in data.items():
+            if (
+                isinstance(value, str)
+                and len(value.encode("utf-8")) >= config.min_bytes
+            ):
+                digest = hash_body(value)
+                blobs[digest] = value
+                refs[key] = digest
+            else:
+                stored[key] = value
+        packed.append((stored, refs))
+
+    if blobs:
+        await _insert_missing(db, blobs)
+    return packed
+
+
+def _legacy_refs(data: Any) -> Optional[Dict[str, str]]:
+    """Refs kept inside the data by rows written before the content_refs column."""
+    if not isinstance(data, dict):
+        return None
+    refs = data.get(LEGACY_REFS_KEY)
+    if not isinstance(refs, dict) or not all(
+        isinstance(digest, str) and _DIGEST.match(digest) for digest in refs.values()
+    ):
+        return None
+    return refs
+
+
+async def unpack(
+    db: AsyncSession, rows: Iterable[Tuple[Any, Optional[Dict[str, str]]]]
+) -> List[Any]:
+    """
+    Restore the original data of stored (data, refs) rows, loading bodies in
+    one query. Rows without refs (None) were written before the
+    content_refs column and may keep them in their data instead.
+    """
+    rows = list(rows)
+    resolved = []
+    digests: Set[str] = set()
+    for data, refs in rows:
+        if refs is None:
+            refs = _legacy_refs(data)
+            if refs is not None:
+                data = {k: v for k, v in data.items() if k != LEGACY_REFS_KEY}
+        resolved.append((data, refs))
+        if refs:
+            digests.update(refs.values())
+    if not digests:
+        return [data for data, _ in resolved]
+
+    result = await db.execute(
+        select(models.ContentBlob.hash, models.ContentBlob.body).where(
+            models.ContentBlob.hash.in_(list(digests))
+        )
+    )
+    bodies = dict(result.all())
+    unpacked = []
+    for data, refs in resolved:
+        if refs:
+            data = dict(data)
+            for key, digest in refs.items():
+                data[key] = bodies.get(digest)
+        unpacked.append(data)
+    return unpacked
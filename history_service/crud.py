@@ -1,25 +1,187 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import JSON, select, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional, Tuple
+import content_store
 import models
 import schemas
+import storage_codec
 
 
-def create_history_record(
-    db: Session, user_id: int, record_data: schemas.HistoryRecordCreate
+async def _with_content(db: AsyncSession, records) -> List[schemas.HistoryRecord]:
+    """Records as returned by the API, with deduplicated bodies restored."""
+    data_list = await content_store.unpack(
+        db, [(record.data, record.content_refs) for record in records]
+    )
+    return [
+        schemas.HistoryRecord(
+            id=record.id, user_id=record.user_id, timestamp=record.timestamp, data=data
+        )
+        for record, data in zip(records, data_list)
+    ]
+
+
+async def create_history_record(
+    db: AsyncSession, user_id: int, record_data: schemas.HistoryRecordCreate
 ):
-    db_record = models.HistoryRecord(user_id=user_id, data=record_data.concept_details)
-    db.add(db_record)
-    db.commit()
-    db.refresh(db_record)
-    return db_record
+    records = await create_history_records(
+        db, [(user_id, record_data.concept_details, record_data.idempotency_key)]
+    )
+    return records[0]
 
 
-def get_history_records_by_user(
-    db: Session, user_id: int, skip: int = 0, limit: int = 100
+async def create_history_records(
+    db: AsyncSession, rows: List[Tuple[int, Any, Optional[str]]]
 ):
-    return (
-        db.query(models.HistoryRecord)
-        .filter(models.HistoryRecord.user_id == user_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
+    """
+    Insert several (user_id, data, idempotency_key) rows in a single
+    transaction. Returns the records in the same order as `rows`; a row
+    whose key was already stored for the user (earlier or in this batch)
+    gets the existing record instead of a new one.
+    """
+    keys = {key for _, _, key in rows if key is not None}
+    record_ids = {}
+    if keys:
+        result = await db.execute(
+            select(
+                models.HistoryRecord.user_id,
+                models.HistoryRecord.idempotency_key,
+                models.HistoryRecord.id,
+            ).where(models.HistoryRecord.idempotency_key.in_(keys))
+        )
+        record_ids = {(user_id, key): record_id for user_id, key, record_id in result}
+
+    new_rows = []
+    seen = set()
+    for user_id, data, key in rows:
+        if key is not None:
+            if (user_id, key) in record_ids or (user_id, key) in seen:
+                continue
+            seen.add((user_id, key))
+        new_rows.append((user_id, data, key))
+
+    packed = await content_store.pack(db, [data for _, data, _ in new_rows])
+    db_records = [
+        models.HistoryRecord(
+            user_id=user_id, data=data, content_refs=refs, idempotency_key=key
+        )
+        for (user_id, _, key), (data, refs) in zip(new_rows, packed)
+    ]
+    db.add_all(db_records)
+    await db.flush()
+    unkeyed_ids = []
+    for (user_id, _, key), record in zip(new_rows, db_records):
+        if key is None:
+            unkeyed_ids.append(record.id)
+        else:
+            record_ids[(user_id, key)] = record.id
+    await db.commit()
+
+    unkeyed_ids = iter(unkeyed_ids)
+    ids = [
+        next(unkeyed_ids) if key is None else record_ids[(user_id, key)]
+        for user_id, _, key in rows
+    ]
+
+    # Reload every row (with its server-side timestamp) in one query
+    result = await db.execute(
+        select(models.HistoryRecord)
+        .where(models.HistoryRecord.id.in_(ids))
+        .execution_options(populate_existing=True)
+    )
+    loaded = {record.id: record for record in result.scalars().all()}
+    return await _with_content(db, [loaded[record_id] for record_id in ids])
+
+
+def _history_page(query, user_id: int, limit: int, cursor: Optional[int]):
+    """
+    Restrict `query` to one page of a user's history, newest first, ordered
+    by (timestamp, id). `cursor` is the id of the last record of the previous
+    page; the page boundary is found with the (user_id, timestamp, id) index,
+    so deep pages cost the same as the first one.
+    """
+    query = query.where(models.HistoryRecord.user_id == user_id)
+    if cursor is not None:
+        # Compare against the stored row so timestamps match like-for-like
+        anchor = select(models.HistoryRecord.timestamp, models.HistoryRecord.id).where(
+            models.HistoryRecord.id == cursor,
+            models.HistoryRecord.user_id == user_id,
+        )
+        query = query.where(
+            tuple_(models.HistoryRecord.timestamp, models.HistoryRecord.id)
+            < anchor.scalar_subquery()
+        )
+    return query.order_by(
+        models.HistoryRecord.timestamp.desc(), models.HistoryRecord.id.desc()
+    ).limit(limit)
+
+
+async def get_history_records_by_user(
+    db: AsyncSession, user_id: int, limit: int = 100, cursor: Optional[int] = None
+):
+    """One page of a user's full history records, newest first."""
+    query = _history_page(select(models.HistoryRecord), user_id, limit, cursor)
+    records = (await db.execute(query)).scalars().all()
+    return await _with_content(db, records)
+
+
+async def get_history_summaries_by_user(
+    db: AsyncSession, user_id: int, limit: int = 100, cursor: Optional[int] = None
+) -> List[schemas.HistoryRecordSummary]:
+    """
+    One page of a user's history as summaries, newest first. Concept and
+    model are extracted from the JSON in SQL, so explanation bodies are
+    neither read nor sent. Rows whose whole payload is wrapped by the
+    storage codec (compressed, or escaped) are decoded individually.
+    """
+    # Read the raw stored JSON, bypassing the storage codec
+    raw_data = type_coerce(models.HistoryRecord.data, JSON)
+    query = select(
+        models.HistoryRecord.id,
+        models.HistoryRecord.timestamp,
+        raw_data["concept"].as_string(),
+        raw_data["model_used"].as_string(),
+        raw_data[storage_codec.CODEC_KEY].as_string(),
+    )
+    rows = (await db.execute(_history_page(query, user_id, limit, cursor))).all()
+
+    compressed = [record_id for record_id, _, _, _, codec in rows if codec]
+    decoded = {}
+    if compressed:
+        result = await db.execute(
+            select(models.HistoryRecord.id, models.HistoryRecord.data).where(
+                models.HistoryRecord.id.in_(compressed)
+            )
+        )
+        decoded = dict(result.all())
+
+    summaries = []
+    for record_id, timestamp, concept, model_used, _ in rows:
+        data = decoded.get(record_id)
+        if isinstance(data, dict):
+            concept = data.get("concept")
+            model_used = data.get("model_used")
+        summaries.append(
+            schemas.HistoryRecordSummary(
+                id=record_id,
+                timestamp=timestamp,
+                concept=concept if isinstance(concept, str) else None,
+                model_used=model_used if isinstance(model_used, str) else None,
+            )
+        )
+    return summaries
+
+
+async def get_history_record(
+    db: AsyncSession, user_id: int, record_id: int
+) -> Optional[schemas.HistoryRecord]:
+    """A single full history record belonging to the user, or None."""
+    result = await db.execute(
+        select(models.HistoryRecord).where(
+            models.HistoryRecord.id == record_id,
+            models.HistoryRecord.user_id == user_id,
+        )
     )
+    record = result.scalars().first()
+    if record is None:
+        return None
+    return (await _with_content(db, [record]))[0]
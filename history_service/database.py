@@ -1,26 +1,72 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+from storage_profile import StorageProfileConfig, apply_sqlite_pragmas, engine_options
+
 DATABASE_URL = os.getenv("HISTORY_DATABASE_URL", "sqlite:///./history.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Needed for SQLite
-)
+
+def async_database_url(url: str) -> str:
+    """The same database reached through an asyncio driver."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    for prefix in ("postgresql://", "postgres://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    return url
+
+
+storage_profile = StorageProfileConfig()
+
+# Sync engine for table creation and maintenance commands
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, storage_profile))
+apply_sqlite_pragmas(engine, storage_profile)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, storage_profile)
+)
+apply_sqlite_pragmas(async_engine.sync_engine, storage_profile)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def add_missing_columns():
+    """Add nullable columns that were introduced after a table was created."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    )
+                )
 
 
 def create_db_and_tables():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    # create_all skips tables that already exist, so add any new indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
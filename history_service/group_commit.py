@@ -0,0 +1,133 @@
+"""
+Group commit for history record inserts.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, List, Optional, Tuple
+
+import crud
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitConfig:
+    """Configuration for group-committed history inserts."""
+
+    def __init__(self):
+        self.enabled = os.getenv("HISTORY_GROUP_COMMIT", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        # Maximum rows written in one transaction
+        self.max_rows = int(os.getenv("HISTORY_GROUP_COMMIT_MAX_ROWS", "100"))
+        # How long the writer waits for more rows before committing (milliseconds)
+        self.max_wait_ms = float(os.getenv("HISTORY_GROUP_COMMIT_WAIT_MS", "2"))
+
+
+class GroupCommitWriter:
+    """
+    Single writer task that buffers concurrently submitted rows for a few
+    milliseconds (or up to `max_rows`) and inserts them in one transaction,
+    so many requests share one commit. Each submitter waits until its rows
+    are committed and gets back the created records. If a group fails, its
+    submissions are retried one by one, so only the bad one gets the error.
+    """
+
+    def __init__(self, config: GroupCommitConfig):
+        self.config = config
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Commit whatever is buffered and stop the writer task."""
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put_nowait(None)
+            await worker
+
+    async def submit(self, rows: List[Tuple[int, Any, Optional[str]]]) -> List[Any]:
+        """
+        Insert (user_id, data, idempotency_key) rows, returning once they
+        are committed.
+        """
+        if not rows:
+            return []
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((rows, future))
+        # Shield so a caller going away does not fail the rest of the group
+        return await asyncio.shield(future)
+
+    async def _collect(self, first) -> Tuple[list, bool]:
+        """Gather submissions until the row or time limit is hit."""
+        loop = asyncio.get_running_loop()
+        pending = [first]
+        rows = len(first[0])
+        deadline = loop.time() + self.config.max_wait_ms / 1000
+        stopping = False
+        while rows < self.config.max_rows:
+            timeout = deadline - loop.time()
+            try:
+                if timeout > 0:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                else:
+                    item = self._queue.get_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if item is None:
+                stopping = True
+                break
+            pending.append(item)
+            rows += len(item[0])
+        return pending, stopping
+
+    async def _commit(self, pending: list):
+        rows = [row for submitted, _ in pending for row in submitted]
+        try:
+            async with AsyncSessionLocal() as db:
+                records = await crud.create_history_records(db, rows)
+        except Exception as e:
+            if len(pending) > 1:
+                # Nothing was committed; retry each submission on its own so
+                # one bad submission does not fail the rest of the group
+                logger.warning(
+                    f"Group commit of {len(rows)} history rows failed, "
+                    f"committing submissions separately: {str(e)}"
+                )
+                for item in pending:
+                    await self._commit([item])
+                return
+            logger.error(f"Group commit of {len(rows)} history rows failed: {str(e)}")
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for submitted, future in pending:
+            if not future.done():
+                future.set_result(records[offset : offset + len(submitted)])
+            offset += len(submitted)
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                break
+            pending, stopping = await self._collect(first)
+            await self._commit(pending)
+            if stopping:
+                break
+        # Drain anything submitted while stopping
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                await self._commit([item])
@@ -1,19 +1,43 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Header
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
 from jose import JWTError, jwt
+from contextlib import asynccontextmanager
 import os
 
 import crud
 import schemas
-from database import SessionLocal, create_db_and_tables
+from database import create_db_and_tables, get_db
+from group_commit import GroupCommitConfig, GroupCommitWriter
+from deadlines import DeadlineMiddleware
+from wire_format import NegotiatedRoute
 
 
 # Create database tables
 create_db_and_tables()
 
-app = FastAPI(title="History Service")
+# Buffers concurrent inserts so they share one transaction
+group_commit_config = GroupCommitConfig()
+group_commit_writer = GroupCommitWriter(group_commit_config)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    if group_commit_config.enabled:
+        group_commit_writer.start()
+    yield
+    # Shutdown: commit anything still buffered
+    await group_commit_writer.stop()
+
+
+app = FastAPI(title="History Service", lifespan=lifespan)
+# Answer service clients in msgpack and browsers in JSON
+app.router.route_class = NegotiatedRoute
+
+# Abandon work whose caller has stopped waiting for it
+app.add_middleware(DeadlineMiddleware)
 
 # Configure CORS to allow local frontend communication
 app.add_middleware(
@@ -34,17 +58,8 @@ SECRET_KEY = os.getenv(
 ALGORITHM = "HS256"
 
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 async def get_current_user_from_token(
-    authorization: Optional[str] = Header(None), db: Session = Depends(get_db)
+    authorization: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)
 ) -> schemas.TokenData:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,9 +87,9 @@ async def get_current_user_from_token(
 
 
 @app.post("/history/", response_model=schemas.HistoryRecord)
-def add_history_record(
+async def add_history_record(
     record: schemas.HistoryRecordCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.TokenData = Depends(get_current_user_from_token),
 ):
     """
@@ -85,20 +100,62 @@ def add_history_record(
     """
     if current_user.user_id is None:
         raise HTTPException(status_code=403, detail="User ID not found in token")
-    return crud.create_history_record(
+    if group_commit_config.enabled:
+        records = await group_commit_writer.submit(
+            [(current_user.user_id, record.concept_details, record.idempotency_key)]
+        )
+        return records[0]
+    return await crud.create_history_record(
         db=db, user_id=current_user.user_id, record_data=record
     )
 
 
-@app.get("/history/{user_id}", response_model=List[schemas.HistoryRecord])
-def read_user_history(
+@app.post("/history/batch", response_model=List[schemas.HistoryRecord])
+async def add_history_records(
+    batch: schemas.HistoryRecordBatchCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user_from_token),
+):
+    """
+    Add several history records for the authenticated user in one transaction.
+    - **records**: List of objects with `concept_details` and an optional
+      `idempotency_key`; a record whose key was already stored for the user
+      is returned as stored instead of being added again.
+
+    Requires Bearer token authentication.
+    """
+    if current_user.user_id is None:
+        raise HTTPException(status_code=403, detail="User ID not found in token")
+    rows = [
+        (current_user.user_id, record.concept_details, record.idempotency_key)
+        for record in batch.records
+    ]
+    if group_commit_config.enabled:
+        return await group_commit_writer.submit(rows)
+    return await crud.create_history_records(db, rows)
+
+
+@app.get(
+    "/history/{user_id}",
+    response_model=Union[
+        List[schemas.HistoryRecord], List[schemas.HistoryRecordSummary]
+    ],
+)
+async def read_user_history(
     user_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[int] = Query(None),
+    summary: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.TokenData = Depends(get_current_user_from_token),
 ):
     """
     Retrieve history records for a specific user.
     - **user_id**: The ID of the user whose history is to be retrieved.
+    - **limit**: Maximum number of records to return (newest first).
+    - **cursor**: The `X-Next-Cursor` value from the previous page.
+    - **summary**: Return only id, timestamp, concept and model for each record.
 
     Requires Bearer token authentication.
     Ensures that the authenticated user can only access their own history or if they have admin rights (not implemented here).
@@ -110,10 +167,48 @@ def read_user_history(
             detail="Not authorized to access this history",
         )
 
-    history_records = crud.get_history_records_by_user(db, user_id=user_id)
+    if summary:
+        history_records = await crud.get_history_summaries_by_user(
+            db, user_id=user_id, limit=limit, cursor=cursor
+        )
+    else:
+        history_records = await crud.get_history_records_by_user(
+            db, user_id=user_id, limit=limit, cursor=cursor
+        )
+    # A full page may have more after it; the last id is the next cursor
+    if len(history_records) == limit:
+        response.headers["X-Next-Cursor"] = str(history_records[-1].id)
     return history_records
 
 
+@app.get("/history/{user_id}/{record_id}", response_model=schemas.HistoryRecord)
+async def read_history_record(
+    user_id: int,
+    record_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user_from_token),
+):
+    """
+    Retrieve a single history record with its full details.
+    - **user_id**: The ID of the user the record belongs to.
+    - **record_id**: The ID of the record.
+
+    Requires Bearer token authentication.
+    """
+    if current_user.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this history",
+        )
+
+    history_record = await crud.get_history_record(
+        db, user_id=user_id, record_id=record_id
+    )
+    if history_record is None:
+        raise HTTPException(status_code=404, detail="History record not found")
+    return history_record
+
+
 # Health check endpoint
 @app.get("/history/health")
 def health_check():
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, DateTime, JSON
+from sqlalchemy import JSON, Column, Integer, DateTime, Index, String
 from sqlalchemy.sql import func  # For auto-generating timestamp
 from database import Base
+from storage_codec import CompressedJSON, CompressedText
 
 
 class HistoryRecord(Base):
@@ -12,5 +13,30 @@ class HistoryRecord(Base):
     )  # Assuming user_id comes from JWT
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     data = Column(
-        JSON, nullable=False
+        CompressedJSON, nullable=False
     )  # To store concept_details or other activity logs
+    # Hashes of the fields of `data` moved to content_blobs, by field name.
+    # NULL on rows written before this column existed
+    content_refs = Column(JSON, nullable=True)
+    # Client-chosen key that makes resending the same record harmless
+    idempotency_key = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        # Serves keyset-paginated history listings: newest first per user
+        Index("ix_history_records_user_timestamp_id", "user_id", "timestamp", "id"),
+        Index(
+            "ux_history_records_user_idempotency_key",
+            "user_id",
+            "idempotency_key",
+            unique=True,
+        ),
+    )
+
+
+class ContentBlob(Base):
+    """Large history bodies (explanations, prompts) stored once by hash."""
+
+    __tablename__ = "content_blobs"
+
+    hash = Column(String(64), primary_key=True)  # sha256 of the body
+    body = Column(CompressedText, nullable=False)
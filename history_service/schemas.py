@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Any, Optional
+from pydantic import BaseModel, Field
+from typing import Any, List, Optional
 from datetime import datetime
 
 
@@ -7,6 +7,13 @@ from datetime import datetime
 class HistoryRecordCreate(BaseModel):
     # user_id will be extracted from JWT, not directly from request body for POST
     concept_details: Any  # Flexible JSON structure
+    # Resending a record with the same key returns the stored record
+    idempotency_key: Optional[str] = Field(None, max_length=64)
+
+
+# Pydantic model for creating several history records in one request
+class HistoryRecordBatchCreate(BaseModel):
+    records: List[HistoryRecordCreate]
 
 
 # Pydantic model for representing a history record in responses
@@ -20,6 +27,14 @@ class HistoryRecord(BaseModel):
         from_attributes = True  # To allow direct creation from SQLAlchemy model
 
 
+# Pydantic model for the lightweight history listing (no explanation body)
+class HistoryRecordSummary(BaseModel):
+    id: int
+    timestamp: datetime
+    concept: Optional[str] = None
+    model_used: Optional[str] = None
+
+
 # For JWT token data (similar to Auth service, but only what's needed)
 class TokenData(BaseModel):
     email: Optional[str] = None
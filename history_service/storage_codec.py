@@ -0,0 +1,160 @@
+"""
+Transparent compression of stored history payloads.
+"""
+
+import base64
+import json
+import logging
+import os
+import re
+import zlib
+from typing import Any, Optional
+
+from sqlalchemy.types import JSON, Text, TypeDecorator
+
+try:
+    import zstandard
+except ImportError:  # Optional; only needed for HISTORY_STORAGE_CODEC=zstd
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODECS = ("none", "zlib", "zstd")
+
+# Marker keys of a compressed JSON payload
+CODEC_KEY = "_codec"
+PAYLOAD_KEY = "payload"
+
+# Compressed text is stored as "<codec>:<base64>"
+_COMPRESSED_TEXT = re.compile(r"^(zlib|zstd):([A-Za-z0-9+/]+={0,2})$")
+# Uncompressed text that could be mistaken for that is stored as "none:<text>"
+_ESCAPED_TEXT = "none:"
+
+# Errors from decoding a value that only looks compressed
+_DECODE_ERRORS = (ValueError, zlib.error) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+class StorageCodecConfig:
+    """Configuration for history payload compression."""
+
+    def __init__(self):
+        # Codec for new writes: none, zlib or zstd (needs the zstandard package)
+        self.codec = os.getenv("HISTORY_STORAGE_CODEC", "none").lower()
+        if self.codec not in CODECS:
+            logger.warning(f"Unknown HISTORY_STORAGE_CODEC '{self.codec}', using none")
+            self.codec = "none"
+        if self.codec == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed, using zlib instead")
+            self.codec = "zlib"
+        # Payloads smaller than this (bytes) are stored uncompressed
+        self.min_bytes = int(os.getenv("HISTORY_COMPRESS_MIN_BYTES", "1024"))
+        self.level = int(os.getenv("HISTORY_COMPRESS_LEVEL", "6"))
+
+
+config = StorageCodecConfig()
+
+
+def compress(raw: bytes, codec: str, level: int) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(raw)
+    return zlib.compress(raw, level)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed rows")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _encode(raw: bytes) -> Optional[str]:
+    """Compressed, base64-encoded `raw`, or None if it should be left as is."""
+    if config.codec == "none" or len(raw) < config.min_bytes:
+        return None
+    packed = compress(raw, config.codec, config.level)
+    # Base64 costs a third; only keep the result if it still saves space
+    if len(packed) * 4 // 3 >= len(raw):
+        return None
+    return base64.b64encode(packed).decode("ascii")
+
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON column whose large values are stored as
+    {"_codec": ..., "payload": <base64>}. Values are decompressed on read
+    whatever codec is currently configured, so the codec can be changed
+    without rewriting old rows. Uncompressed objects with a "_codec" key of
+    their own are stored as {"_codec": "none", "payload": <value>}, so user
+    data is never taken for a compressed payload.
+    """
+
+    impl = JSON
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> Any:
+        if value is None:
+            return None
+        payload = _encode(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        if payload is not None:
+            return {CODEC_KEY: config.codec, PAYLOAD_KEY: payload}
+        if isinstance(value, dict) and CODEC_KEY in value:
+            return {CODEC_KEY: "none", PAYLOAD_KEY: value}
+        return value
+
+    def process_result_value(self, value: Any, dialect) -> Any:
+        if (
+            not isinstance(value, dict)
+            or len(value) != 2
+            or value.get(CODEC_KEY) not in CODECS
+            or PAYLOAD_KEY not in value
+        ):
+            return value
+        codec, payload = value[CODEC_KEY], value[PAYLOAD_KEY]
+        if codec == "none":
+            return payload
+        if not isinstance(payload, str):
+            return value
+        try:
+            return json.loads(decompress(base64.b64decode(payload), codec))
+        except _DECODE_ERRORS:
+            # User data stored verbatim before such objects were escaped
+            return value
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column whose large values are stored as "<codec>:<base64>".
+    Uncompressed values are stored verbatim, unless they could be read back
+    as compressed, in which case they are stored as "none:<value>".
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[str]:
+        if value is None:
+            return None
+        payload = _encode(value.encode("utf-8"))
+        if payload is not None:
+            return f"{config.codec}:{payload}"
+        if value.startswith(_ESCAPED_TEXT) or _COMPRESSED_TEXT.match(value):
+            return f"{_ESCAPED_TEXT}{value}"
+        return value
+
+    def process_result_value(self, value: Optional[str], dialect) -> Optional[str]:
+        if value is None:
+            return None
+        if value.startswith(_ESCAPED_TEXT):
+            return value[len(_ESCAPED_TEXT) :]
+        match = _COMPRESSED_TEXT.match(value)
+        if match is None:
+            return value
+        codec, payload = match.groups()
+        try:
+            return decompress(base64.b64decode(payload), codec).decode("utf-8")
+        except _DECODE_ERRORS:
+            # Text stored verbatim before such values were escaped
+            return value
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Service modules are imported flat, with shared/ on the path as in Docker
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(SERVICE_DIR), "shared"))
+sys.path.insert(0, SERVICE_DIR)
+
+# Module names more than one service uses
+SERVICE_MODULES = ("crud", "database", "main", "models", "schemas", "service_clients")
+
+
+def use_service_modules():
+    """
+    Put this service first on the path and forget another service's modules
+    of the same name, so the tests collected next import this service's own.
+    """
+    sys.path.remove(SERVICE_DIR)
+    sys.path.insert(0, SERVICE_DIR)
+    for name in SERVICE_MODULES:
+        module = sys.modules.get(name)
+        if module is not None and not module.__file__.startswith(SERVICE_DIR):
+            del sys.modules[name]
+
+
+use_service_modules()
+
+
+def pytest_collectstart(collector):
+    use_service_modules()
+
+
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+import content_store  # noqa: E402
+import storage_codec  # noqa: E402
+from database import Base  # noqa: E402
+
+
+@pytest.fixture
+def codec(monkeypatch):
+    """Set the storage codec; payloads from 64 bytes are compressed."""
+    monkeypatch.setattr(storage_codec.config, "min_bytes", 64)
+
+    def use(name: str):
+        monkeypatch.setattr(storage_codec.config, "codec", name)
+
+    use("none")
+    return use
+
+
+@pytest.fixture
+def dedup(monkeypatch):
+    """Deduplication on, for string fields from 32 bytes."""
+    monkeypatch.setattr(content_store.config, "enabled", True)
+    monkeypatch.setattr(content_store.config, "min_bytes", 32)
+    return content_store.config
+
+
+@pytest.fixture
+def run_db():
+    """Run `fn(db)` against a fresh in-memory database."""
+
+    def run(fn):
+        async def main():
+            engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            Session = async_sessionmaker(
+                engine, autoflush=False, expire_on_commit=False
+            )
+            try:
+                async with Session() as db:
+                    return await fn(db)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
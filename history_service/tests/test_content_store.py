@@ -0,0 +1,78 @@
+from sqlalchemy import func, select
+
+import content_store
+import models
+
+BODY = "Imagine you want to build a really tall tower with your blocks. " * 4
+
+
+def test_large_fields_move_out_of_the_data(dedup, run_db):
+    async def run(db):
+        packed = await content_store.pack(
+            db, [{"concept": "Loop", "explanation": BODY}, ["not", "an", "object"]]
+        )
+        return packed, await db.scalar(select(func.count(models.ContentBlob.hash)))
+
+    packed, blobs = run_db(run)
+    (data, refs), (other, other_refs) = packed
+    assert data == {"concept": "Loop"}
+    assert refs == {"explanation": content_store.hash_body(BODY)}
+    assert (other, other_refs) == (["not", "an", "object"], {})
+    assert blobs == 1
+
+
+def test_round_trip_stores_each_body_once(dedup, run_db):
+    records = [
+        {"concept": "Loop", "explanation": BODY},
+        {"concept": "Loop again", "explanation": BODY, "prompt": BODY + "?"},
+    ]
+
+    async def run(db):
+        packed = await content_store.pack(db, records)
+        blobs = await db.scalar(select(func.count(models.ContentBlob.hash)))
+        return await content_store.unpack(db, packed), blobs
+
+    unpacked, blobs = run_db(run)
+    assert unpacked == records
+    assert blobs == 2
+
+
+def test_user_data_with_the_legacy_refs_key_round_trips(dedup, run_db):
+    records = [
+        {"concept": "a", "_content_refs": {"note": "hi"}},
+        {"concept": "b", "_content_refs": {"x": "0" * 64}, "explanation": BODY},
+    ]
+
+    async def run(db):
+        return await content_store.unpack(db, await content_store.pack(db, records))
+
+    assert run_db(run) == records
+
+
+def test_legacy_rows_keep_refs_in_their_data(dedup, run_db):
+    digest = content_store.hash_body(BODY)
+
+    async def run(db):
+        await content_store.pack(db, [{"explanation": BODY}])
+        return await content_store.unpack(
+            db,
+            [
+                ({"concept": "Loop", "_content_refs": {"explanation": digest}}, None),
+                ({"concept": "a", "_content_refs": {"note": "hi"}}, None),
+            ],
+        )
+
+    assert run_db(run) == [
+        {"concept": "Loop", "explanation": BODY},
+        {"concept": "a", "_content_refs": {"note": "hi"}},
+    ]
+
+
+def test_disabled_store_keeps_data_whole(dedup, run_db):
+    dedup.enabled = False
+    record = {"concept": "Loop", "explanation": BODY}
+
+    async def run(db):
+        return await content_store.pack(db, [record])
+
+    assert run_db(run) == [(record, {})]
@@ -0,0 +1,132 @@
+from datetime import datetime
+
+import pytest
+
+import crud
+import models
+
+EXPLANATION = "Imagine you want to build a really tall tower with your blocks. " * 4
+
+
+@pytest.mark.parametrize("name", ["none", "zlib"])
+def test_stored_records_read_back_unchanged(codec, dedup, run_db, name):
+    codec(name)
+    payloads = [
+        {"concept": "Loop", "explanation": EXPLANATION},
+        {"_codec": "zlib", "payload": "abcd"},
+        {"concept": "a", "_content_refs": {"note": "hi"}},
+        {"concept": "b", "_content_refs": {"note": "hi"}, "explanation": EXPLANATION},
+    ]
+
+    async def run(db):
+        created = await crud.create_history_records(
+            db, [(1, data, None) for data in payloads]
+        )
+        listed = await crud.get_history_records_by_user(db, user_id=1)
+        single = await crud.get_history_record(db, user_id=1, record_id=created[1].id)
+        summaries = await crud.get_history_summaries_by_user(db, user_id=1)
+        return created, listed, single, summaries
+
+    created, listed, single, summaries = run_db(run)
+    assert [record.data for record in created] == payloads
+    assert [record.data for record in reversed(listed)] == payloads
+    assert single.data == payloads[1]
+    assert [summary.concept for summary in reversed(summaries)] == [
+        "Loop",
+        None,
+        "a",
+        "b",
+    ]
+
+
+def test_idempotency_keys_prevent_duplicates(run_db):
+    async def run(db):
+        rows = [
+            (1, {"concept": "a"}, "key-1"),
+            (1, {"concept": "a again"}, "key-1"),
+            (1, {"concept": "b"}, None),
+            (2, {"concept": "other user"}, "key-1"),
+        ]
+        first = await crud.create_history_records(db, rows)
+        resent = await crud.create_history_records(db, rows)
+        listed = await crud.get_history_records_by_user(db, user_id=1)
+        return first, resent, listed
+
+    first, resent, listed = run_db(run)
+    first_ids = [record.id for record in first]
+    assert first_ids[0] == first_ids[1]
+    assert first[1].data == {"concept": "a"}
+    assert first_ids[3] not in first_ids[:3]
+    # Keyed records come back as stored; the unkeyed one is added again
+    resent_ids = [record.id for record in resent]
+    assert resent_ids[:2] == first_ids[:2]
+    assert resent_ids[3] == first_ids[3]
+    assert resent_ids[2] not in first_ids
+    assert len(listed) == 3
+
+
+async def add_history(db):
+    """Seven records for user 1, three sharing a timestamp, and one for user 2."""
+    stamps = [datetime(2024, 1, day) for day in (1, 2, 2, 2, 3, 4, 5)]
+    for n, stamp in enumerate(stamps):
+        db.add(
+            models.HistoryRecord(user_id=1, data={"concept": f"c{n}"}, timestamp=stamp)
+        )
+    db.add(models.HistoryRecord(user_id=2, data={"concept": "other"}))
+    await db.commit()
+
+
+async def walk(fetch, limit):
+    """Follow cursors page by page until a short page; returns the pages."""
+    pages, cursor = [], None
+    while True:
+        page = await fetch(limit=limit, cursor=cursor)
+        pages.append([record.id for record in page])
+        if len(page) < limit:
+            return pages
+        cursor = page[-1].id
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_pages_cover_the_history_once_newest_first(run_db, limit):
+    async def run(db):
+        await add_history(db)
+        everything = await crud.get_history_records_by_user(db, user_id=1)
+        records = await walk(
+            lambda **page: crud.get_history_records_by_user(db, user_id=1, **page),
+            limit,
+        )
+        summaries = await walk(
+            lambda **page: crud.get_history_summaries_by_user(db, user_id=1, **page),
+            limit,
+        )
+        return everything, records, summaries
+
+    everything, records, summaries = run_db(run)
+    assert [record.data["concept"] for record in everything] == [
+        "c6",
+        "c5",
+        "c4",
+        # Same timestamp: the higher id is newer
+        "c3",
+        "c2",
+        "c1",
+        "c0",
+    ]
+    expected = [record.id for record in everything]
+    assert [i for page in records for i in page] == expected
+    assert all(len(page) <= limit for page in records)
+    assert summaries == records
+
+
+def test_cursor_from_another_user_returns_nothing(run_db):
+    async def run(db):
+        await add_history(db)
+        (other,) = await crud.get_history_records_by_user(db, user_id=2)
+        return (
+            await crud.get_history_records_by_user(db, user_id=1, cursor=other.id),
+            await crud.get_history_records_by_user(db, user_id=2, cursor=other.id),
+            await crud.get_history_records_by_user(db, user_id=1, cursor=10_000),
+        )
+
+    assert run_db(run) == ([], [], [])
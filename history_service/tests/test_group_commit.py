@@ -0,0 +1,111 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+import crud
+import group_commit
+from group_commit import GroupCommitConfig, GroupCommitWriter
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Batches passed to crud.create_history_records, by row count."""
+    batches = []
+    create = crud.create_history_records
+
+    async def counting(db, rows):
+        batches.append(len(rows))
+        return await create(db, rows)
+
+    monkeypatch.setattr(crud, "create_history_records", counting)
+    return batches
+
+
+def writer(monkeypatch, db, max_rows: int = 100) -> GroupCommitWriter:
+    """Writer whose transactions run on the test session."""
+
+    @asynccontextmanager
+    async def session():
+        try:
+            yield db
+        except BaseException:
+            await db.rollback()
+            raise
+
+    monkeypatch.setattr(group_commit, "AsyncSessionLocal", session)
+    config = GroupCommitConfig()
+    config.max_rows = max_rows
+    config.max_wait_ms = 20
+    return GroupCommitWriter(config)
+
+
+def test_concurrent_submissions_share_one_commit(monkeypatch, run_db, writes):
+    async def run(db):
+        history = writer(monkeypatch, db)
+        results = await asyncio.gather(
+            history.submit([(1, {"concept": "a"}, None)]),
+            history.submit([(2, {"concept": "b"}, None), (2, {"concept": "c"}, None)]),
+            history.submit([(1, {"concept": "d"}, None)]),
+        )
+        await history.stop()
+        return results
+
+    results = run_db(run)
+    assert writes == [4]
+    assert [[record.data["concept"] for record in r] for r in results] == [
+        ["a"],
+        ["b", "c"],
+        ["d"],
+    ]
+    assert [record.user_id for record in results[1]] == [2, 2]
+
+
+def test_groups_are_capped_at_max_rows(monkeypatch, run_db, writes):
+    async def run(db):
+        history = writer(monkeypatch, db, max_rows=2)
+        await asyncio.gather(
+            *(history.submit([(1, {"concept": str(n)}, None)]) for n in range(3))
+        )
+        await history.stop()
+
+    run_db(run)
+    assert writes == [2, 1]
+
+
+def test_a_failing_submission_does_not_fail_the_group(monkeypatch, run_db, writes):
+    async def run(db):
+        history = writer(monkeypatch, db)
+        results = await asyncio.gather(
+            history.submit([(1, {"concept": "a"}, None)]),
+            # user_id is required, so this row cannot be inserted
+            history.submit([(None, {"concept": "bad"}, None)]),
+            history.submit([(1, {"concept": "c"}, None)]),
+            return_exceptions=True,
+        )
+        await history.stop()
+        stored = await crud.get_history_records_by_user(db, user_id=1)
+        return results, stored
+
+    (first, failed, last), stored = run_db(run)
+    assert isinstance(failed, Exception)
+    assert first[0].data == {"concept": "a"}
+    assert last[0].data == {"concept": "c"}
+    assert sorted(record.data["concept"] for record in stored) == ["a", "c"]
+    # The group, then each submission on its own
+    assert writes == [3, 1, 1, 1]
+
+
+def test_stop_commits_buffered_rows(monkeypatch, run_db, writes):
+    async def run(db):
+        history = writer(monkeypatch, db)
+        submitted = asyncio.ensure_future(
+            history.submit([(1, {"concept": "Loop"}, None)])
+        )
+        await asyncio.sleep(0)
+        await history.stop()
+        return await submitted
+
+    (record,) = run_db(run)
+    assert record.data == {"concept": "Loop"}
+    assert writes == [1]
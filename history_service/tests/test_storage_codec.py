@@ -0,0 +1,86 @@
+import base64
+import zlib
+
+import pytest
+
+from storage_codec import CompressedJSON, CompressedText
+
+LARGE = {"concept": "Recursion", "explanation": "A function calling itself. " * 20}
+
+
+def round_trip(column, value):
+    stored = column.process_bind_param(value, None)
+    return stored, column.process_result_value(stored, None)
+
+
+def test_small_values_are_stored_as_is(codec):
+    codec("zlib")
+    value = {"concept": "Loop"}
+    assert round_trip(CompressedJSON(), value) == (value, value)
+
+
+def test_large_values_are_compressed(codec):
+    codec("zlib")
+    stored, loaded = round_trip(CompressedJSON(), LARGE)
+    assert stored["_codec"] == "zlib"
+    assert len(stored["payload"]) < len(LARGE["explanation"])
+    assert loaded == LARGE
+
+
+def test_rows_decode_after_the_codec_changes(codec):
+    codec("zlib")
+    stored = CompressedJSON().process_bind_param(LARGE, None)
+    codec("none")
+    assert CompressedJSON().process_result_value(stored, None) == LARGE
+
+
+@pytest.mark.parametrize("name", ["none", "zlib"])
+@pytest.mark.parametrize(
+    "value",
+    [
+        {"_codec": "zlib", "payload": "abcd"},
+        {"_codec": "none", "payload": [1, 2]},
+        {"_codec": "anything", "concept": "Loop"},
+    ],
+)
+def test_user_data_shaped_like_an_envelope_round_trips(codec, name, value):
+    codec(name)
+    assert round_trip(CompressedJSON(), value)[1] == value
+
+
+def test_legacy_row_that_only_looks_compressed_is_returned_as_stored():
+    stored = {"_codec": "zlib", "payload": "abcd"}
+    assert CompressedJSON().process_result_value(stored, None) == stored
+
+
+def test_non_objects_round_trip(codec):
+    codec("zlib")
+    for value in (["a"] * 100, "text", 3, None):
+        assert round_trip(CompressedJSON(), value)[1] == value
+
+
+def test_text_is_compressed_and_restored(codec):
+    codec("zlib")
+    text = "Imagine a tower of blocks. " * 20
+    stored, loaded = round_trip(CompressedText(), text)
+    assert stored.startswith("zlib:")
+    assert loaded == text
+
+
+@pytest.mark.parametrize("name", ["none", "zlib"])
+@pytest.mark.parametrize(
+    "text",
+    [
+        "zlib:" + base64.b64encode(zlib.compress(b"hidden")).decode(),
+        "zstd:AAAA",
+        "none:plain",
+        "plain",
+    ],
+)
+def test_text_shaped_like_compressed_text_round_trips(codec, name, text):
+    codec(name)
+    assert round_trip(CompressedText(), text)[1] == text
+
+
+def test_legacy_text_that_only_looks_compressed_is_returned_as_stored():
+    assert CompressedText().process_result_value("zlib:QUJD", None) == "zlib:QUJD"
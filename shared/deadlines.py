@@ -0,0 +1,151 @@
+"""
+Request deadlines that travel with calls between the ELI5 microservices.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds the caller is still willing to wait for the response. A
+# relative budget rather than a timestamp, so clock skew between hosts
+# does not matter.
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+# Absolute deadline of the current request on the event loop clock
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+class DeadlineConfig:
+    """Configuration for inbound request deadlines."""
+
+    def __init__(self):
+        # Budget for requests that arrive without a deadline header
+        # (seconds, 0 for none)
+        self.default_seconds = float(os.getenv("REQUEST_DEADLINE_SECONDS", "0"))
+
+
+def set_deadline(seconds: Optional[float]) -> contextvars.Token:
+    """Give the current request `seconds` to finish (None for no deadline)."""
+    deadline = None if seconds is None else time.monotonic() + seconds
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token: contextvars.Token):
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline():
+    """Raise 504 if the current request's deadline has already passed."""
+    if expired():
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+
+
+def outgoing_header() -> dict:
+    """Header passing the remaining budget on to a downstream service."""
+    left = remaining()
+    if left is None:
+        return {}
+    return {DEADLINE_HEADER: str(max(int(left * 1000), 0))}
+
+
+class DeadlineMiddleware:
+    """
+    Starts every HTTP request's deadline from the caller's header (or the
+    configured default) and abandons requests whose deadline passes before
+    a response has started, answering 504 instead of finishing work nobody
+    is waiting for. Once the response has started it is allowed to finish.
+    """
+
+    def __init__(self, app, config: Optional[DeadlineConfig] = None):
+        self.app = app
+        self.config = config or DeadlineConfig()
+
+    def _budget(self, scope) -> Optional[float]:
+        for name, value in scope.get("headers", []):
+            if name.decode("latin-1").lower() == DEADLINE_HEADER.lower():
+                try:
+                    return int(value) / 1000
+                except ValueError:
+                    break
+        return self.config.default_seconds or None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = self._budget(scope)
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+        if budget <= 0:
+            await _send_timeout(send)
+            return
+
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        token = set_deadline(budget)
+        try:
+            task = asyncio.ensure_future(self.app(scope, receive, send_wrapper))
+        finally:
+            reset_deadline(token)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=budget)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if done or started:
+            await task
+            return
+
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        logger.warning(f"Abandoned {scope['method']} {scope['path']} past its deadline")
+        if not started:
+            await _send_timeout(send)
+
+
+async def _send_timeout(send):
+    body = b'{"detail":"Request deadline exceeded"}'
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
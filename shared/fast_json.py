@@ -0,0 +1,97 @@
+"""
+JSON responses rendered with orjson instead of the standard encoder.
+"""
+
+import inspect
+import logging
+import os
+from typing import Any, Callable, Optional, Type
+
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Whether this FastAPI serializes response models straight to JSON bytes
+# with pydantic, which it only does for routes left on the default class
+PYDANTIC_JSON_PATH = "dump_json" in inspect.signature(serialize_response).parameters
+
+
+class FastJSONConfig:
+    """Configuration for fast JSON rendering."""
+
+    def __init__(self):
+        self.enabled = os.getenv("FAST_JSON_RESPONSES", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        if self.enabled and orjson is None:
+            logger.warning("FAST_JSON_RESPONSES is set but orjson is not installed")
+            self.enabled = False
+
+
+# Created on first use, so settings loaded from .env after import apply
+config: Optional[FastJSONConfig] = None
+
+
+def _enabled() -> bool:
+    global config
+    if config is None:
+        config = FastJSONConfig()
+    return config.enabled
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson when FAST_JSON_RESPONSES is on. Both
+    produce compact UTF-8 JSON, so the bytes are identical, with two
+    exceptions: floats written in exponent form (below 1e-4 or from 1e16)
+    are spelled differently but parse to the same value, and NaN/Infinity
+    become null instead of failing. Content orjson rejects (integers beyond
+    64 bits, non-string keys) goes through the standard encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if _enabled():
+            try:
+                return orjson.dumps(content)
+            except TypeError:
+                # Integers beyond 64 bits and non-string keys
+                pass
+        return super().render(content)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    Route answering with FastJSONResponse when FAST_JSON_RESPONSES is on,
+    and with FastAPI's default response otherwise. Routes that set their
+    own response class keep it, and so do routes with a response model
+    where FastAPI already renders those with pydantic, which beats building
+    the content for orjson.
+    """
+
+    def get_route_handler(self) -> Callable:
+        if (
+            _enabled()
+            and isinstance(self.response_class, DefaultPlaceholder)
+            and not (PYDANTIC_JSON_PATH and self.response_field is not None)
+        ):
+            return self.handler_with(FastJSONResponse)
+        return super().get_route_handler()
+
+    def handler_with(self, response_class: Type[Response]) -> Callable:
+        """Request handler for this route answering with `response_class`."""
+        default = self.response_class
+        self.response_class = response_class
+        try:
+            return APIRoute.get_route_handler(self)
+        finally:
+            self.response_class = default
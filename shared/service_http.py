@@ -0,0 +1,321 @@
+"""
+Shared HTTP client for calls between the ELI5 microservices.
+"""
+
+import asyncio
+import httpx
+import os
+import logging
+import random
+from typing import Optional, Dict, Any
+from fastapi import HTTPException
+
+import deadlines
+import wire_format
+
+try:
+    import h2  # noqa: F401  # Optional; needed for SERVICE_HTTP2=true
+except ImportError:
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClientConfig:
+    """Connection pool and retry settings shared by every service client."""
+
+    def __init__(self):
+        # Per-attempt timeout, capped by the request deadline, and the
+        # maximum number of attempts per call
+        self.timeout = float(os.getenv("HTTP_TIMEOUT", "30.0"))
+        self.max_retries = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+        # Exponential backoff with full jitter between attempts (seconds)
+        self.retry_base_delay = float(os.getenv("HTTP_RETRY_BASE_DELAY", "0.1"))
+        self.retry_max_delay = float(os.getenv("HTTP_RETRY_MAX_DELAY", "2.0"))
+        # Retry budget: every call earns `ratio` of a retry, up to `burst`
+        # saved retries, so a failing dependency sees at most ~10% extra load
+        self.retry_budget_ratio = float(os.getenv("HTTP_RETRY_BUDGET_RATIO", "0.1"))
+        self.retry_budget_burst = float(os.getenv("HTTP_RETRY_BUDGET_BURST", "10"))
+
+        # Connections per downstream service, and how many stay open when idle
+        self.max_connections = int(os.getenv("SERVICE_HTTP_MAX_CONNECTIONS", "100"))
+        self.max_keepalive = int(os.getenv("SERVICE_HTTP_MAX_KEEPALIVE", "20"))
+        # How long an idle keep-alive connection is kept (seconds)
+        self.keepalive_expiry = float(
+            os.getenv("SERVICE_HTTP_KEEPALIVE_EXPIRY", "30.0")
+        )
+        # How long a request may wait for a free connection (seconds)
+        self.pool_timeout = float(os.getenv("SERVICE_HTTP_POOL_TIMEOUT", "5.0"))
+
+        # Multiplex requests over HTTP/2 (needs the h2 package and an
+        # HTTP/2-capable server; falls back to HTTP/1.1 otherwise)
+        self.http2 = os.getenv("SERVICE_HTTP2", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        if self.http2 and h2 is None:
+            logger.warning("SERVICE_HTTP2 is set but h2 is not installed")
+            self.http2 = False
+
+
+# Methods that may be repeated without changing the result
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Failures where the request never reached the server, so any method is safe
+# to retry
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RetryBudget:
+    """Token bucket limiting retries to a fraction of calls."""
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+
+    def deposit(self):
+        """Record a call, earning part of a retry."""
+        self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Spend one retry if the budget allows it."""
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+# Service URL scheme for a co-located service listening on a Unix domain
+# socket, e.g. unix:///run/eli5/auth.sock
+UDS_SCHEME = "unix://"
+
+
+class BaseServiceClient:
+    """
+    Base class for all service clients with common HTTP functionality.
+    `base_url` is an http(s) URL, or a unix:// socket path for a service on
+    the same host.
+    """
+
+    def __init__(self, base_url: str, config: Optional[HttpClientConfig] = None):
+        self.base_url = base_url.rstrip("/")
+        self.config = config or HttpClientConfig()
+        self.wire_format = wire_format.WireFormatConfig()
+
+        self.uds_path = None
+        self._request_base = self.base_url
+        if self.base_url.startswith(UDS_SCHEME):
+            # Plain HTTP over the socket; the host name is only used in headers
+            self.uds_path = self.base_url[len(UDS_SCHEME) :]
+            self._request_base = "http://localhost"
+
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive,
+                keepalive_expiry=self.config.keepalive_expiry,
+            ),
+            http2=self.config.http2,
+            uds=self.uds_path,
+        )
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.config.timeout, pool=self.config.pool_timeout),
+            transport=transport,
+        )
+        # httpcore connection pool behind the transport, for usage stats
+        self._pool = transport._pool
+
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._requests = 0
+        self._saturated = 0
+        self._pool_timeouts = 0
+
+        self.retry_budget = RetryBudget(
+            self.config.retry_budget_ratio, self.config.retry_budget_burst
+        )
+        self._retries = 0
+        self._retries_denied = 0
+        self._deadline_exceeded = 0
+
+    def _attempt_timeout(self) -> httpx.Timeout:
+        """Attempt timeout, shortened to whatever is left of the deadline."""
+        timeout = self.config.timeout
+        pool_timeout = self.config.pool_timeout
+        left = deadlines.remaining()
+        if left is not None:
+            timeout = min(timeout, left)
+            pool_timeout = min(pool_timeout, left)
+        return httpx.Timeout(timeout, pool=pool_timeout)
+
+    def _deadline_error(self) -> HTTPException:
+        self._deadline_exceeded += 1
+        return HTTPException(
+            status_code=504, detail=f"Deadline exceeded calling {self.base_url}"
+        )
+
+    async def _backoff(self, attempt: int) -> bool:
+        """
+        Wait before the next attempt. Returns False when no retry should be
+        made: out of attempts, out of retry budget, or out of time.
+        """
+        if attempt + 1 >= self.config.max_retries:
+            return False
+        delay = random.uniform(
+            0,
+            min(
+                self.config.retry_max_delay,
+                self.config.retry_base_delay * 2**attempt,
+            ),
+        )
+        left = deadlines.remaining()
+        if left is not None and left <= delay:
+            return False
+        if not self.retry_budget.withdraw():
+            self._retries_denied += 1
+            logger.warning(f"Retry budget for {self.base_url} exhausted")
+            return False
+        self._retries += 1
+        await asyncio.sleep(delay)
+        return True
+
+    def _pool_exhausted(self) -> bool:
+        """
+        Whether a new request has to wait for a connection: the pool is at
+        its limit and no connection can take another request. Judged per
+        connection, since one HTTP/2 connection carries many requests at once.
+        """
+        connections = self._pool.connections
+        return len(connections) >= self.config.max_connections and not any(
+            connection.is_available() for connection in connections
+        )
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send one request, recording connection pool usage."""
+        if self._pool_exhausted():
+            # Every connection is busy, so this request waits for the pool
+            self._saturated += 1
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        self._requests += 1
+        try:
+            return await self.client.request(method=method, url=url, **kwargs)
+        except httpx.PoolTimeout:
+            self._pool_timeouts += 1
+            logger.warning(f"Timed out waiting for a connection to {self.base_url}")
+            raise
+        finally:
+            self._in_flight -= 1
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        headers: Optional[Dict[str, str]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        idempotent: Optional[bool] = None,
+    ) -> httpx.Response:
+        """
+        Make HTTP request with error handling and retries.
+
+        Retries back off exponentially with jitter and draw on the client's
+        retry budget. Server errors and timeouts are only retried for
+        idempotent requests (by method, unless `idempotent` says otherwise);
+        any request is retried if it could not be sent at all. Every attempt
+        carries the remaining request deadline and fails with 504 once it
+        has passed.
+        """
+        url = f"{self._request_base}{endpoint}"
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        self.retry_budget.deposit()
+
+        content = None
+        if json_data is not None:
+            content, content_type = wire_format.encode_body(json_data)
+            headers = {**(headers or {}), "Content-Type": content_type}
+
+        for attempt in range(self.config.max_retries):
+            if deadlines.expired():
+                raise self._deadline_error()
+            request_headers = {
+                **wire_format.request_headers(self.wire_format),
+                **(headers or {}),
+                **deadlines.outgoing_header(),
+            }
+            try:
+                logger.info(f"Making {method} request to {url} (attempt {attempt + 1})")
+
+                response = await self._send(
+                    method,
+                    url,
+                    headers=request_headers,
+                    content=content,
+                    data=data,
+                    params=params,
+                    timeout=self._attempt_timeout(),
+                )
+
+                # Log response details
+                logger.info(f"Response status: {response.status_code} for {url}")
+
+                if response.status_code < 500:
+                    # Don't retry client errors (4xx), only server errors (5xx)
+                    return response
+                retryable = idempotent
+
+            except (httpx.ConnectError, httpx.TimeoutException) as e:
+                logger.warning(f"Request attempt {attempt + 1} failed: {str(e)}")
+                if deadlines.expired():
+                    raise self._deadline_error()
+                retryable = idempotent or isinstance(e, NOT_SENT_ERRORS)
+                if not retryable or attempt == self.config.max_retries - 1:
+                    raise HTTPException(
+                        status_code=503, detail=f"Service unavailable: {self.base_url}"
+                    )
+            except Exception as e:
+                logger.error(f"Unexpected error in request: {str(e)}")
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Internal error communicating with service: {str(e)}",
+                )
+
+            if not retryable or not await self._backoff(attempt):
+                break
+
+        raise HTTPException(status_code=503, detail="Service communication failed")
+
+    def _json(self, response: httpx.Response) -> Any:
+        """Response body, decoded from JSON or msgpack."""
+        return wire_format.decode_body(response)
+
+    async def close(self):
+        """Close the HTTP client."""
+        await self.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection pool usage; `saturated` counts requests that had to wait."""
+        return {
+            "base_url": self.base_url,
+            "transport": "uds" if self.uds_path else "tcp",
+            "wire_format": self.wire_format.format,
+            "http2": self.config.http2,
+            "max_connections": self.config.max_connections,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "requests": self._requests,
+            "saturated": self._saturated,
+            "pool_timeouts": self._pool_timeouts,
+            "retries": self._retries,
+            "retries_denied": self._retries_denied,
+            "retry_budget": round(self.retry_budget.tokens, 2),
+            "deadline_exceeded": self._deadline_exceeded,
+        }
@@ -0,0 +1,74 @@
+"""
+Entry point serving a service over TCP and, optionally, a Unix domain socket.
+
+Usage:
+    python -m service_server main:app
+
+HOST and PORT set the TCP listener (default 0.0.0.0:8000). When
+SERVICE_UDS names a socket path, the same server also listens there, so
+co-located services can reach it without going through the TCP stack
+(point them at it with a unix:// service URL). Both listeners share one
+application and one lifespan.
+"""
+
+import logging
+import os
+import socket
+import stat
+import sys
+from typing import Any, Union
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceServerConfig:
+    """Listener configuration for a service."""
+
+    def __init__(self):
+        self.host = os.getenv("HOST", "0.0.0.0")
+        self.port = int(os.getenv("PORT", "8000"))
+        # Unix domain socket path for co-located callers (empty for none)
+        self.uds_path = os.getenv("SERVICE_UDS", "")
+
+
+def unix_socket(path: str) -> socket.socket:
+    """Listening socket at `path`, replacing a stale socket file if present."""
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    # Other services' containers may run as different users
+    os.chmod(path, 0o666)
+    return sock
+
+
+def tcp_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    # An explicit IPPROTO_TCP lets asyncio turn on TCP_NODELAY for accepted
+    # connections; without it small responses stall behind delayed ACKs
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    return sock
+
+
+def serve(app: Union[str, Any], config: ServiceServerConfig):
+    """Run `app` (an ASGI app or "module:attribute") on the configured listeners."""
+    sockets = [tcp_socket(config.host, config.port)]
+    if config.uds_path:
+        sockets.append(unix_socket(config.uds_path))
+        logger.info(f"Also serving {app} on unix socket {config.uds_path}")
+    # uvicorn re-raises the stop signal on exit, so a socket file left behind
+    # is removed by unix_socket() on the next start instead
+    uvicorn.Server(uvicorn.Config(app)).run(sockets=sockets)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serve(sys.argv[1] if len(sys.argv) > 1 else "main:app", ServiceServerConfig())
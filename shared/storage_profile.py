@@ -0,0 +1,90 @@
+"""
+Engine settings for the selected storage profile.
+"""
+
+import os
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILES = ("default", "production")
+
+
+class StorageProfileConfig:
+    """Configuration for database engines."""
+
+    def __init__(self):
+        # "default" keeps driver defaults; "production" applies the tuning below
+        self.profile = os.getenv("STORAGE_PROFILE", "default").lower()
+        if self.profile not in PROFILES:
+            self.profile = "default"
+
+        # SQLite: memory-mapped I/O and page cache sizes (bytes / KiB)
+        self.sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 2**20)))
+        self.sqlite_cache_size_kb = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+        # How long a connection waits on a locked database (milliseconds)
+        self.sqlite_busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+        # Postgres connection pool
+        self.pg_pool_size = int(os.getenv("DB_POOL_SIZE", "10"))
+        self.pg_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+        self.pg_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+        self.pg_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        # Server-side limits per statement and per idle transaction (milliseconds)
+        self.pg_statement_timeout_ms = int(
+            os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000")
+        )
+        self.pg_idle_in_transaction_timeout_ms = int(
+            os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", "60000")
+        )
+
+
+def engine_options(url: str, config: StorageProfileConfig) -> Dict[str, Any]:
+    """Keyword arguments for create_engine / create_async_engine."""
+    if url.startswith("sqlite"):
+        if "aiosqlite" in url:
+            return {}
+        return {"connect_args": {"check_same_thread": False}}  # Needed for SQLite
+
+    if config.profile != "production" or not url.startswith("postgres"):
+        return {}
+    settings = {
+        "statement_timeout": str(config.pg_statement_timeout_ms),
+        "idle_in_transaction_session_timeout": str(
+            config.pg_idle_in_transaction_timeout_ms
+        ),
+    }
+    if "asyncpg" in url:
+        connect_args = {"server_settings": settings}
+    else:
+        connect_args = {
+            "options": " ".join(f"-c {key}={value}" for key, value in settings.items())
+        }
+    return {
+        "pool_size": config.pg_pool_size,
+        "max_overflow": config.pg_max_overflow,
+        "pool_timeout": config.pg_pool_timeout,
+        "pool_recycle": config.pg_pool_recycle,
+        "pool_pre_ping": True,
+        "connect_args": connect_args,
+    }
+
+
+def apply_sqlite_pragmas(engine: Engine, config: StorageProfileConfig):
+    """
+    Enable WAL, relaxed fsync, mmap and a larger page cache on every new
+    SQLite connection of `engine` (pass `sync_engine` for async engines).
+    """
+    if config.profile != "production" or engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={config.sqlite_mmap_size}")
+        cursor.execute(f"PRAGMA cache_size=-{config.sqlite_cache_size_kb}")
+        cursor.execute(f"PRAGMA busy_timeout={config.sqlite_busy_timeout_ms}")
+        cursor.close()
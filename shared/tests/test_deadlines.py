@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+
+import deadlines
+from deadlines import DEADLINE_HEADER, DeadlineConfig, DeadlineMiddleware
+
+
+def config(default_seconds: float = 0.0) -> DeadlineConfig:
+    config = DeadlineConfig()
+    config.default_seconds = default_seconds
+    return config
+
+
+async def call(app, headers=()):
+    """Status, body and messages of one request sent straight to `app`."""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return messages[0]["status"], body
+
+
+def endpoint(delay: float = 0.0, seen=None):
+    """ASGI app recording the deadline it sees, after an optional delay."""
+
+    async def app(scope, receive, send):
+        if seen is not None:
+            seen.append(deadlines.remaining())
+        await asyncio.sleep(delay)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return app
+
+
+def test_header_sets_the_request_deadline():
+    seen = []
+    app = DeadlineMiddleware(endpoint(seen=seen), config())
+    status, _ = asyncio.run(call(app, [(DEADLINE_HEADER, "2000")]))
+    assert status == 200
+    assert seen[0] == pytest.approx(2.0, abs=0.1)
+
+
+def test_no_header_and_no_default_means_no_deadline():
+    seen = []
+    app = DeadlineMiddleware(endpoint(seen=seen), config())
+    assert asyncio.run(call(app))[0] == 200
+    assert seen == [None]
+
+
+def test_default_applies_without_a_valid_header():
+    seen = []
+    app = DeadlineMiddleware(endpoint(seen=seen), config(default_seconds=5))
+    asyncio.run(call(app, [(DEADLINE_HEADER, "soon")]))
+    assert seen[0] == pytest.approx(5.0, abs=0.1)
+
+
+def test_spent_budget_is_rejected_without_running_the_app():
+    seen = []
+    app = DeadlineMiddleware(endpoint(seen=seen), config())
+    status, body = asyncio.run(call(app, [(DEADLINE_HEADER, "0")]))
+    assert status == 504
+    assert json.loads(body) == {"detail": "Request deadline exceeded"}
+    assert seen == []
+
+
+def test_work_past_the_deadline_is_abandoned():
+    cancelled = []
+
+    async def slow(scope, receive, send):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    app = DeadlineMiddleware(slow, config())
+    status, _ = asyncio.run(call(app, [(DEADLINE_HEADER, "50")]))
+    assert status == 504
+    assert cancelled == [True]
+
+
+def test_started_response_is_allowed_to_finish():
+    async def streaming(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await asyncio.sleep(0.1)
+        await send({"type": "http.response.body", "body": b"late"})
+
+    app = DeadlineMiddleware(streaming, config())
+    assert asyncio.run(call(app, [(DEADLINE_HEADER, "20")])) == (200, b"late")
@@ -0,0 +1,29 @@
+import pytest
+
+from service_http import RetryBudget
+
+
+def test_starts_with_a_full_burst():
+    budget = RetryBudget(ratio=0.1, burst=3)
+    assert [budget.withdraw() for _ in range(4)] == [True, True, True, False]
+
+
+def test_calls_earn_a_fraction_of_a_retry():
+    budget = RetryBudget(ratio=0.25, burst=2)
+    budget.withdraw()
+    budget.withdraw()
+    for _ in range(3):
+        budget.deposit()
+    assert budget.tokens == pytest.approx(0.75)
+    assert not budget.withdraw()
+
+    budget.deposit()
+    assert budget.withdraw()
+    assert budget.tokens == pytest.approx(0)
+
+
+def test_savings_are_capped_at_the_burst():
+    budget = RetryBudget(ratio=0.5, burst=2)
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 2
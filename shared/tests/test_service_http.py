@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import deadlines
+from deadlines import DEADLINE_HEADER
+from service_http import BaseServiceClient, HttpClientConfig
+
+
+def client(handler, **overrides) -> BaseServiceClient:
+    """Client whose requests are answered by `handler` instead of the network."""
+    config = HttpClientConfig()
+    config.max_retries = 3
+    config.retry_base_delay = 0.001
+    config.retry_max_delay = 0.001
+    config.retry_budget_ratio = 0.1
+    config.retry_budget_burst = 10
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    service = BaseServiceClient("http://history", config)
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+
+def failing(requests, status: int = 503):
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(status, json={"detail": "down"})
+
+    return handler
+
+
+def test_remaining_deadline_is_sent_downstream():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={})
+
+    async def run():
+        service = client(handler)
+        await service._make_request("GET", "/history/1")
+        deadlines.set_deadline(2.0)
+        await service._make_request("GET", "/history/1")
+
+    asyncio.run(run())
+    assert DEADLINE_HEADER not in requests[0].headers
+    assert 1900 <= int(requests[1].headers[DEADLINE_HEADER]) <= 2000
+
+
+def test_server_errors_are_retried_only_when_idempotent():
+    requests = []
+
+    async def run():
+        service = client(failing(requests))
+        for method, idempotent in (("GET", None), ("POST", None), ("POST", True)):
+            with pytest.raises(HTTPException) as error:
+                await service._make_request(method, "/history/", idempotent=idempotent)
+            assert error.value.status_code == 503
+        return service.stats()
+
+    stats = asyncio.run(run())
+    assert [request.method for request in requests] == ["GET"] * 3 + ["POST"] * 4
+    assert stats["retries"] == 4
+
+
+def test_retries_stop_when_the_budget_runs_out():
+    requests = []
+
+    async def run():
+        service = client(failing(requests), retry_budget_burst=1)
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await service._make_request("GET", "/history/1")
+        return service.stats()
+
+    stats = asyncio.run(run())
+    # One retry for the first call, none left for the second
+    assert len(requests) == 3
+    assert stats["retries"] == 1
+    assert stats["retries_denied"] == 2
+
+
+def test_spent_deadline_fails_without_sending():
+    requests = []
+
+    async def run():
+        service = client(failing(requests))
+        deadlines.set_deadline(0)
+        with pytest.raises(HTTPException) as error:
+            await service._make_request("GET", "/history/1")
+        return error.value, service.stats()
+
+    error, stats = asyncio.run(run())
+    assert error.status_code == 504
+    assert requests == []
+    assert stats["deadline_exceeded"] == 1
+
+
+def test_client_errors_are_returned_without_retrying():
+    requests = []
+
+    async def run():
+        service = client(failing(requests, status=404))
+        return await service._make_request("GET", "/history/1")
+
+    assert asyncio.run(run()).status_code == 404
+    assert len(requests) == 1
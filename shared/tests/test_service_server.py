@@ -0,0 +1,66 @@
+import asyncio
+import os
+import socket
+import stat
+
+import pytest
+import uvicorn
+from fastapi import FastAPI
+
+from service_http import BaseServiceClient
+from service_server import tcp_socket, unix_socket
+
+
+def test_unix_socket_replaces_a_stale_socket_file(tmp_path):
+    path = str(tmp_path / "run" / "auth.sock")
+    unix_socket(path).close()
+    # The file is left behind, as after a crash
+    assert stat.S_ISSOCK(os.stat(path).st_mode)
+
+    sock = unix_socket(path)
+    sock.close()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666
+
+
+def test_unix_socket_leaves_other_files_alone(tmp_path):
+    path = tmp_path / "auth.sock"
+    path.write_text("not a socket")
+    with pytest.raises(OSError):
+        unix_socket(str(path))
+    assert path.read_text() == "not a socket"
+
+
+def test_tcp_socket_is_created_for_tcp():
+    sock = tcp_socket("127.0.0.1", 0)
+    try:
+        assert sock.proto == socket.IPPROTO_TCP
+    finally:
+        sock.close()
+
+
+def test_client_calls_a_service_over_its_unix_socket(tmp_path):
+    path = str(tmp_path / "history.sock")
+    app = FastAPI()
+
+    @app.get("/history/health")
+    async def health():
+        return {"status": "ok"}
+
+    async def run():
+        server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+        serving = asyncio.ensure_future(server.serve(sockets=[unix_socket(path)]))
+        while not server.started:
+            await asyncio.sleep(0.01)
+        service = BaseServiceClient(f"unix://{path}")
+        try:
+            response = await service._make_request("GET", "/history/health")
+            return response.json(), service.stats()
+        finally:
+            await service.close()
+            server.should_exit = True
+            await serving
+
+    body, stats = asyncio.run(run())
+    assert body == {"status": "ok"}
+    assert stats["transport"] == "uds"
+    assert stats["requests"] == 1
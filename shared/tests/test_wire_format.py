@@ -0,0 +1,108 @@
+import asyncio
+
+import httpx
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+import wire_format
+from service_http import BaseServiceClient
+from wire_format import MSGPACK_MEDIA_TYPE, NegotiatedRoute, WireFormatConfig
+
+ACCEPT_MSGPACK = {"Accept": f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.9"}
+
+
+class Record(BaseModel):
+    id: int
+    concept: str
+
+
+@pytest.fixture
+def service():
+    app = FastAPI()
+    app.router.route_class = NegotiatedRoute
+
+    @app.get("/records/{record_id}", response_model=Record)
+    async def get_record(record_id: int):
+        # The response model drops the extra field in either encoding
+        return {"id": record_id, "concept": "Loop", "secret": "x"}
+
+    @app.post("/records/")
+    async def create_record(record: Record):
+        return {"created": record.model_dump()}
+
+    @app.get("/plain", response_class=PlainTextResponse)
+    async def plain():
+        return "text"
+
+    return TestClient(app)
+
+
+def test_json_by_default(service):
+    response = service.get("/records/1")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"id": 1, "concept": "Loop"}
+    assert response.headers["vary"] == "Accept"
+
+
+def test_msgpack_when_accepted(service):
+    response = service.get("/records/1", headers=ACCEPT_MSGPACK)
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(response.content) == {"id": 1, "concept": "Loop"}
+    assert response.headers["vary"] == "Accept"
+
+
+def test_msgpack_request_bodies_are_read(service):
+    body = msgpack.packb({"id": 2, "concept": "Recursion"})
+    response = service.post(
+        "/records/", content=body, headers={"Content-Type": MSGPACK_MEDIA_TYPE}
+    )
+    assert response.json() == {"created": {"id": 2, "concept": "Recursion"}}
+
+    response = service.post(
+        "/records/", content=b"\xc1", headers={"Content-Type": MSGPACK_MEDIA_TYPE}
+    )
+    assert response.status_code == 400
+
+
+def test_explicit_response_class_is_kept(service):
+    response = service.get("/plain", headers=ACCEPT_MSGPACK)
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text == "text"
+
+
+def test_unknown_format_falls_back_to_json(monkeypatch):
+    monkeypatch.setenv("SERVICE_WIRE_FORMAT", "protobuf")
+    config = WireFormatConfig()
+    assert config.format == "json"
+    assert wire_format.request_headers(config) == {}
+
+
+def test_client_asks_for_msgpack_and_sends_json(monkeypatch):
+    monkeypatch.setenv("SERVICE_WIRE_FORMAT", "msgpack")
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(
+            200,
+            content=msgpack.packb({"id": 1}),
+            headers={"Content-Type": MSGPACK_MEDIA_TYPE},
+        )
+
+    async def run():
+        service = BaseServiceClient("http://history")
+        service.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        response = await service._make_request(
+            "POST", "/history/", json_data={"concept": "Loop"}
+        )
+        return service._json(response)
+
+    assert asyncio.run(run()) == {"id": 1}
+    (request,) = requests
+    assert request.headers["accept"].startswith(MSGPACK_MEDIA_TYPE)
+    assert request.headers["content-type"] == "application/json"
+    assert request.content == b'{"concept": "Loop"}'
@@ -0,0 +1,120 @@
+"""
+Content negotiation between JSON and msgpack for calls between services.
+
+Only responses are negotiated: a client announces in Accept that it reads
+msgpack and a NegotiatedRoute answers in it, while a service without
+NegotiatedRoute ignores the header and answers JSON. Request bodies are
+always sent as JSON, which every version of a service can read, so callers
+and the services they call can be upgraded in any order.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Callable
+
+import httpx
+from fastapi import HTTPException, Request, Response
+from fastapi.datastructures import DefaultPlaceholder
+
+from fast_json import FastJSONRoute
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+class WireFormatConfig:
+    """Encoding service clients ask for in responses."""
+
+    def __init__(self):
+        # "msgpack" (when the package is installed) or "json"
+        self.format = os.getenv("SERVICE_WIRE_FORMAT", "msgpack").lower()
+        if self.format == "msgpack" and msgpack is None:
+            logger.warning("SERVICE_WIRE_FORMAT is msgpack but it is not installed")
+            self.format = "json"
+        elif self.format not in ("msgpack", "json"):
+            self.format = "json"
+
+
+def _is_msgpack(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() == MSGPACK_MEDIA_TYPE
+
+
+def request_headers(config: WireFormatConfig) -> dict:
+    """Headers announcing the encodings a service client understands."""
+    if config.format != "msgpack":
+        return {}
+    return {"Accept": f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.9"}
+
+
+def encode_body(data: Any) -> tuple:
+    """Request body and content type for `data`, always JSON (see above)."""
+    return json.dumps(data).encode("utf-8"), "application/json"
+
+
+def decode_body(response: httpx.Response) -> Any:
+    """Decode a response body, whichever encoding the service answered in."""
+    if msgpack is not None and _is_msgpack(response.headers.get("content-type", "")):
+        return msgpack.unpackb(response.content)
+    return response.json()
+
+
+class MsgpackResponse(Response):
+    """Response rendered as msgpack."""
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content)
+
+
+class _MsgpackRequest(Request):
+    """Request whose msgpack body FastAPI reads as if it were JSON."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            try:
+                self._json = msgpack.unpackb(await self.body())
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid msgpack body")
+        return self._json
+
+
+class NegotiatedRoute(FastJSONRoute):
+    """
+    Route answering in msgpack when the caller's Accept header asks for it
+    and in JSON otherwise, each through a handler built for that response
+    class, so JSON responses keep FastAPI's own serialization path. It also
+    reads msgpack request bodies, although the service clients here only
+    send JSON.
+    """
+
+    def get_route_handler(self) -> Callable:
+        json_handler = super().get_route_handler()
+        if msgpack is None or not isinstance(self.response_class, DefaultPlaceholder):
+            return json_handler
+        msgpack_handler = self.handler_with(MsgpackResponse)
+
+        async def negotiated_handler(request: Request) -> Response:
+            handler = json_handler
+            if MSGPACK_MEDIA_TYPE in request.headers.get("accept", "").lower():
+                handler = msgpack_handler
+            if _is_msgpack(request.headers.get("content-type", "")):
+                # Present the body as JSON so FastAPI hands it to json()
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (name, b"application/json" if name == b"content-type" else value)
+                    for name, value in request.scope["headers"]
+                ]
+                request = _MsgpackRequest(scope, request.receive)
+            response = await handler(request)
+            response.headers.setdefault("Vary", "Accept")
+            return response
+
+        return negotiated_handler